@@ -0,0 +1,14 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+if [ "$#" -eq 0 ]; then
+    echo "Usage: $0 <motor_ids> [--dt <period>] [--unicast]"
+    exit 1
+fi
+
+uv run software/latency.py "$@"
@@ -0,0 +1,90 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import can
+from rmd_motor import RMDMotor
+import time
+import sys
+
+N_FRAMES = 200000
+
+
+class NullBus:
+    """
+    Bus stub discarding every frame, so that only the encoding cost is measured.
+    """
+    def send(self, msg, timeout=None):
+        pass
+
+
+def legacy_set_position(bus, motor_id, angle_deg, max_speed_dps=3600):
+    """Frame encoding as done before the precompiled codec (list building + fresh can.Message)."""
+    angle_val = int(angle_deg * 100)
+    angle_bytes = angle_val.to_bytes(4, byteorder='little', signed=True)
+    max_speed_bytes = int(max_speed_dps).to_bytes(2, byteorder='little', signed=False)
+    data = [0xA4, 0x00] + list(max_speed_bytes) + list(angle_bytes)
+    msg = can.Message(arbitration_id=motor_id + 0x140, data=data, is_extended_id=False)
+    bus.send(msg)
+
+
+def legacy_update_status(status, data):
+    """Status decoding as done before the dispatch table (slices + dict update)."""
+    if data[0] in [0x9C, 0xA4]:
+        status.update({
+            "temp": data[1],
+            "current": int.from_bytes(data[2:4], byteorder='little', signed=True) * 100,
+            "speed": int.from_bytes(data[4:6], byteorder='little', signed=True),
+            "position": int.from_bytes(data[6:8], byteorder='little', signed=True),
+            "last_update": time.perf_counter()
+        })
+
+
+def measure(func, n):
+    """Returns the number of frames per second processed by func."""
+    start = time.perf_counter()
+    for i in range(n):
+        func(i * 0.01)
+    return n / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_FRAMES
+
+    bus = NullBus()
+    motor = RMDMotor(bus, 1)
+
+    # Both encoders must produce the same frame
+    sent = []
+    bus.send = lambda msg, timeout=None: sent.append(bytes(msg.data))
+    legacy_set_position(bus, 1, -123.456, 500)
+    motor.set_position(-123.456, 500)
+    assert sent[0] == sent[1], f"Frame mismatch: {sent[0].hex()} != {sent[1].hex()}"
+    del bus.send
+
+    before = measure(lambda angle: legacy_set_position(bus, 1, angle), n)
+    after = measure(motor.set_position, n)
+
+    reply = bytearray.fromhex("a41e0500f4ffd2fe")
+    status = {}
+    legacy_update_status(status, reply)
+    motor.update_status(reply)
+    assert (status["temp"], status["current"], status["speed"], status["position"]) == \
+        (motor.status.temp, motor.status.current, motor.status.speed, motor.status.position), "Status mismatch"
+
+    decode_before = measure(lambda _: legacy_update_status(status, reply), n)
+    decode_after = measure(lambda _: motor.update_status(reply), n)
+
+    print(f"Encoded {n} position frames (0xA4):")
+    print(f"  Before (lists + new can.Message): {before:12.0f} frames/s")
+    print(f"  After  (struct + reused message): {after:12.0f} frames/s")
+    print(f"  Speedup: x{after / before:.2f}")
+
+    print(f"Decoded {n} status replies (0xA4):")
+    print(f"  Before (slices + dict update):    {decode_before:12.0f} frames/s")
+    print(f"  After  (dispatch + unpack_from):  {decode_after:12.0f} frames/s")
+    print(f"  Speedup: x{decode_after / decode_before:.2f}")
@@ -0,0 +1,113 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import can
+from rmd_motor import BITRATE
+from motor_state import MAX_MOTOR_ID
+from motor_group import MotorGroup
+from rmd_async import AsyncRMDClient
+from tx_scheduler import TransmitScheduler
+from contextlib import contextmanager, asynccontextmanager
+import os
+
+INTERFACE_ENV = "COCONUTS_CAN_INTERFACE"   # canalystii (default), socketcan, virtual or sim
+CHANNEL_ENV = "COCONUTS_CAN_CHANNEL"
+INTERFACES = ("canalystii", "socketcan", "virtual", "sim")
+DEFAULT_CHANNELS = {
+    "canalystii": 0,
+    "socketcan": "can0",
+    "virtual": "coconuts_sim",
+    "sim": "coconuts_sim",
+}
+
+# Motor replies (0x240-0x27F) and broadcast range (0x280-0x2FF)
+REPLY_FILTERS = [
+    {"can_id": 0x240, "can_mask": 0x7C0, "extended": False},
+    {"can_id": 0x280, "can_mask": 0x780, "extended": False},
+]
+
+
+def bus_config(interface: str=None, channel=None):
+    """
+    Resolves the interface and channel to use, from the arguments or else from
+    the COCONUTS_CAN_INTERFACE and COCONUTS_CAN_CHANNEL environment variables.
+    """
+    if interface is None:
+        interface = os.environ.get(INTERFACE_ENV, "canalystii")
+    if interface not in INTERFACES:
+        raise ValueError(f"Unknown CAN interface '{interface}', expected one of {', '.join(INTERFACES)}")
+    if channel is None:
+        channel = os.environ.get(CHANNEL_ENV, DEFAULT_CHANNELS[interface])
+    if interface == "canalystii" and isinstance(channel, str) and channel.isdigit():
+        channel = int(channel)
+    return interface, channel
+
+
+@contextmanager
+def open_bus(interface: str=None, channel=None, sim_ids=None, filters: bool=True):
+    """
+    Opens a CAN bus and shuts it down on exit.
+    - canalystii: CANalyst-II USB adapter (channel 0 or 1).
+    - socketcan: Linux SocketCAN (e.g. can0), with kernel side timestamps and
+      receive filters. The bitrate is configured with ip link.
+    - virtual: python-can virtual bus.
+    - sim: virtual bus answered by simulated motors (sim_ids, 1 to 32 by default).
+    With filters, only the motor reply range 0x240-0x2FF is received.
+    """
+    interface, channel = bus_config(interface, channel)
+    can_filters = REPLY_FILTERS if filters else None
+
+    sim = None
+    if interface == "canalystii":
+        bus = can.Bus(interface="canalystii", channel=channel, bitrate=BITRATE,
+                      receive_own_messages=False, can_filters=can_filters)
+    elif interface == "socketcan":
+        bus = can.Bus(interface="socketcan", channel=channel, receive_own_messages=False, can_filters=can_filters)
+    else:
+        if interface == "sim":
+            from rmd_sim import SimulatedBus
+            sim = SimulatedBus(sim_ids if sim_ids is not None else range(1, MAX_MOTOR_ID + 1), channel=channel)
+            sim.start()
+        bus = can.Bus(interface="virtual", channel=channel, receive_own_messages=False, can_filters=can_filters)
+
+    try:
+        yield bus
+    finally:
+        bus.shutdown()
+        if sim is not None:
+            sim.stop()
+
+
+@contextmanager
+def connect(ids, interface: str=None, channel=None, recorder=None, monitor=None, tx_budget: float=None):
+    """
+    Opens a CAN bus and yields a MotorGroup of ids, with its listener running.
+    Status replies are logged to recorder (a TelemetryRecorder) and round-trips
+    measured by monitor (a LatencyMonitor) if given. With tx_budget (fraction
+    of the bus), frames are sent through a TransmitScheduler (group.scheduler)
+    limiting the bus load to this budget.
+    """
+    with open_bus(interface, channel, sim_ids=ids) as bus:
+        if tx_budget is None:
+            with MotorGroup(bus, ids, recorder=recorder, monitor=monitor) as group:
+                yield group
+        else:
+            with TransmitScheduler(bus, tx_budget) as scheduler:
+                with MotorGroup(bus, ids, recorder=recorder, monitor=monitor, scheduler=scheduler) as group:
+                    yield group
+
+
+@asynccontextmanager
+async def connect_async(ids, interface: str=None, channel=None, timeout: float=None):
+    """
+    Opens a CAN bus and yields an AsyncRMDClient of ids, with its receive task running.
+    """
+    with open_bus(interface, channel, sim_ids=ids) as bus:
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        async with AsyncRMDClient(bus, ids, **kwargs) as client:
+            yield client
@@ -0,0 +1,165 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from rmd_codec import PIDGains
+import asyncio
+import tomllib
+
+PID_KEYS = PIDGains._fields[1:]     # cur_kp, cur_ki, vel_kp, vel_ki, pos_kp, pos_ki
+ACCELERATION_KEYS = ("pos_acc", "pos_dec", "vel_acc", "vel_dec")
+SPEC_KEYS = ("pid", "acceleration", "filter", "zero")
+UNCHECKED_KEYS = ("filter", "zero")    # Write-only settings, without any command to read them back
+
+
+def parse_motor_spec(motor_id: int, entry: dict):
+    """
+    Normalizes the spec of one motor:
+    - pid: table of gains among PID_KEYS (missing gains are kept as read).
+    - acceleration: one value for the 4 parameters, or a table among ACCELERATION_KEYS.
+    - filter: enables or disables the CAN filter.
+    - zero: sets the current position as zero (applied at the next restart).
+    """
+    unknown = set(entry) - set(SPEC_KEYS)
+    if unknown:
+        raise ValueError(f"Motor ID {motor_id}: unknown parameters {', '.join(sorted(unknown))}")
+
+    spec = {"pid": {}, "acceleration": {}, "filter": entry.get("filter"), "zero": bool(entry.get("zero", False))}
+    for key, value in entry.get("pid", {}).items():
+        if key not in PID_KEYS:
+            raise ValueError(f"Motor ID {motor_id}: unknown PID gain '{key}'")
+        spec["pid"][key] = int(value)
+
+    acceleration = entry.get("acceleration", {})
+    if not isinstance(acceleration, dict):
+        acceleration = {key: acceleration for key in ACCELERATION_KEYS}
+    for key, value in acceleration.items():
+        if key not in ACCELERATION_KEYS:
+            raise ValueError(f"Motor ID {motor_id}: unknown acceleration parameter '{key}'")
+        spec["acceleration"][ACCELERATION_KEYS.index(key)] = int(value)
+    return spec
+
+
+def unchecked_parameters(spec: dict):
+    """Returns the parameters of a motor spec that cannot be verified by reading them back."""
+    return [key for key in UNCHECKED_KEYS if spec[key] is not None and (key != "zero" or spec[key])]
+
+
+def load_spec(path: str):
+    """
+    Loads a fleet spec from a TOML file. The [all] table applies to every motor
+    listed in [motors.<id>], whose own tables override it.
+    Returns a dict mapping motor IDs to their normalized spec.
+    """
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+
+    defaults = config.get("all", {})
+    fleet = {}
+    for id, entry in config.get("motors", {}).items():
+        merged = dict(defaults)
+        for key, value in entry.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = {**merged[key], **value}
+            else:
+                merged[key] = value
+        fleet[int(id)] = parse_motor_spec(int(id), merged)
+    return fleet
+
+
+async def configure_motor(motor, spec: dict, write: bool=True, to_rom: bool=True):
+    """
+    Writes the spec of one motor (unless write is False) and reads it back.
+    The requests of every parameter are sent concurrently.
+    Returns the list of differences as (parameter, expected, read) tuples.
+    The filter and zero settings cannot be read back, so they are never part
+    of the differences (see unchecked_parameters).
+    """
+    gains = await motor.read_pid() if spec["pid"] else None
+    if write:
+        writes = [motor.write_acceleration(index, value) for index, value in spec["acceleration"].items()]
+        if spec["pid"]:
+            merged = {key: spec["pid"].get(key, getattr(gains, key)) for key in PID_KEYS}
+            writes.append(motor.write_pid(**merged, to_rom=to_rom))
+        if spec["filter"] is not None:
+            writes.append(motor.filter_mode(bool(spec["filter"])))
+        if spec["zero"]:
+            writes.append(motor.set_zero())
+        await asyncio.gather(*writes)
+
+    reads = [motor.read_acceleration(index) for index in spec["acceleration"]]
+    if spec["pid"]:
+        reads.append(motor.read_pid())
+    results = await asyncio.gather(*reads)
+
+    diff = []
+    for setting in results[:len(spec["acceleration"])]:
+        expected = spec["acceleration"][setting.index]
+        if setting.value != expected:
+            diff.append((f"acceleration.{ACCELERATION_KEYS[setting.index]}", expected, setting.value))
+    if spec["pid"]:
+        gains = results[-1]
+        for key, expected in spec["pid"].items():
+            if getattr(gains, key) != expected:
+                diff.append((f"pid.{key}", expected, getattr(gains, key)))
+    return diff
+
+
+async def configure(client, fleet: dict, write: bool=True, to_rom: bool=True):
+    """
+    Configures every motor of fleet concurrently, and restarts the motors
+    whose zero was set. Returns a dict mapping motor IDs to their differences,
+    or to the raised exception.
+    """
+    ids = list(fleet)
+    results = await asyncio.gather(
+        *(configure_motor(client[id], fleet[id], write, to_rom) for id in ids),
+        return_exceptions=True
+    )
+    if write:
+        for id in ids:
+            if fleet[id]["zero"]:
+                client[id].motor.restart()
+    return dict(zip(ids, results))
+
+
+if __name__ == "__main__":
+    from can_bus import connect_async
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Configures a fleet of RMD motors from a TOML spec and checks it by reading it back.")
+    parser.add_argument("spec", help="TOML spec file (see leg_config.toml).")
+    parser.add_argument("--check", action="store_true", help="Only read back and compare, without writing.")
+    parser.add_argument("--ram", action="store_true", help="Write the PID gains to RAM instead of ROM.")
+    parser.add_argument("--ids", type=int, nargs="+", help="Restrict to these motor IDs.")
+    args = parser.parse_args()
+
+    fleet = load_spec(args.spec)
+    if args.ids is not None:
+        fleet = {id: fleet[id] for id in args.ids if id in fleet}
+
+    async def main():
+        async with connect_async(list(fleet)) as client:
+            return await configure(client, fleet, write=not args.check, to_rom=not args.ram)
+
+    results = asyncio.run(main())
+    failed = False
+    for id, result in results.items():
+        if isinstance(result, Exception):
+            print(f"Motor ID {id}: {result}")
+            failed = True
+        elif result:
+            for parameter, expected, value in result:
+                print(f"Motor ID {id}: {parameter} expected {expected}, read {value}")
+            failed = True
+        else:
+            print(f"Motor ID {id}: ok")
+        unchecked = unchecked_parameters(fleet[id])
+        if unchecked:
+            print(f"Motor ID {id}: {', '.join(unchecked)} not checked (write-only on the motor)")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,125 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from collections import deque
+import numpy as np
+import os
+import time
+
+SPIN = 0.001  # Duration of the final busy-wait before each deadline (s)
+JITTER_WINDOW = 100000  # Latest ticks kept for the jitter percentiles
+
+
+def set_realtime(priority: int=50, cpus=None):
+    """
+    Switches the calling thread to the SCHED_FIFO policy with the given priority
+    and optionally pins it to the set of CPU indices cpus (Linux only).
+    Returns True on success. Requires CAP_SYS_NICE or an rtprio limit.
+    """
+    try:
+        if cpus is not None:
+            os.sched_setaffinity(0, cpus)
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+    except (AttributeError, OSError) as e:
+        print(f"Real-time scheduling unavailable: {e}")
+        return False
+    return True
+
+
+def wait_until(deadline: float, spin: float=SPIN):
+    """
+    Waits until time.perf_counter() reaches deadline, sleeping first and
+    busy-waiting only during the last spin seconds.
+    """
+    remaining = deadline - time.perf_counter() - spin
+    if remaining > 0:
+        time.sleep(remaining)
+    while time.perf_counter() < deadline:
+        pass
+
+
+class ControlLoop:
+    """
+    Fixed rate loop scheduled against absolute deadlines.
+    Tick k starts at start + k * dt, so that the time lost in one tick is not
+    carried over to the next ones. The lateness of every tick (jitter) and the
+    number of overruns (ticks whose processing ended after the next deadline)
+    are recorded: the count, mean and max cover the whole run, and the
+    percentiles the last JITTER_WINDOW ticks, so that endless runs use
+    constant memory.
+    """
+    def __init__(self, dt: float, spin: float=SPIN, realtime: bool=False, priority: int=50, cpus=None):
+        self.dt = dt
+        self.spin = spin
+        self._reset_stats()
+        if realtime:
+            set_realtime(priority, cpus)
+
+    def run(self, n_ticks: int=None):
+        """
+        Yields the tick indices, each one at its deadline.
+        Runs forever if n_ticks is None.
+        """
+        return self._run(lambda k: k * self.dt, n_ticks)
+
+    def run_at(self, times):
+        """
+        Yields the indices of the tick times (s, from the start of the run,
+        e.g. the timestamp column of a trajectory), each one at its deadline.
+        """
+        return self._run(times.__getitem__, len(times))
+
+    def _reset_stats(self):
+        self.lateness = deque(maxlen=JITTER_WINDOW)
+        self.ticks = 0
+        self.overruns = 0
+        self.lateness_sum = 0.0
+        self.lateness_max = 0.0
+
+    def _run(self, offset, n_ticks):
+        self._reset_stats()
+        start = time.perf_counter()
+        k = 0
+        while n_ticks is None or k < n_ticks:
+            deadline = start + offset(k)
+            now = time.perf_counter()
+            if now > deadline and k > 0:
+                self.overruns += 1
+            else:
+                wait_until(deadline, self.spin)
+                now = time.perf_counter()
+            lateness = now - deadline
+            self.lateness.append(lateness)
+            self.ticks += 1
+            self.lateness_sum += lateness
+            if lateness > self.lateness_max or self.ticks == 1:
+                self.lateness_max = lateness
+            yield k
+            k += 1
+
+    def stats(self):
+        """
+        Returns the jitter statistics of the last run (s).
+        """
+        if self.ticks == 0:
+            return {"ticks": 0, "overruns": 0}
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "jitter_mean": self.lateness_sum / self.ticks,
+            "jitter_p99": float(np.percentile(self.lateness, 99)),
+            "jitter_max": self.lateness_max,
+        }
+
+    def print_stats(self):
+        """Prints the jitter statistics of the last run."""
+        stats = self.stats()
+        print(f"Control loop: {stats['ticks']} ticks at {1 / self.dt:.1f} Hz, {stats['overruns']} overruns")
+        if stats["ticks"]:
+            print(f"  Jitter mean: {stats['jitter_mean'] * 1e3:.3f} ms, "
+                  f"p99: {stats['jitter_p99'] * 1e3:.3f} ms, max: {stats['jitter_max'] * 1e3:.3f} ms")
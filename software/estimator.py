@@ -0,0 +1,171 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from motor_state import MAX_MOTOR_ID
+import numpy as np
+
+ALPHA = 0.3                             # Position gain
+BETA = ALPHA ** 2 / (2 - ALPHA)         # Velocity gain without reported speeds (critically damped alpha-beta filter)
+
+
+class StateEstimator:
+    """
+    Estimator of the position and velocity of every motor, fed by the
+    timestamped status updates and vectorized over the motor IDs.
+    A status handled at time t is taken as a measurement of the motor at
+    t - latency, where latency is the measured age of the statuses, e.g.
+    LatencyMonitor.status_age() (half the median round-trip).
+
+    The position is predicted from the previous estimate by integrating the
+    speeds reported by the motor over the time step, and corrected by alpha
+    times the innovation, which only smooths the quantization of the reported
+    position: the prediction follows accelerations, so the estimate does not
+    lag behind fast motions. The velocity is the reported speed. Without
+    reported speeds, it falls back to an alpha-beta filter (velocity corrected
+    by beta times the innovation over the time step), which lags when the
+    motion accelerates.
+    predict() extrapolates the estimates to any requested time, e.g. the time
+    at which the next setpoint is sent, so that positions compared to targets
+    are not biased by the age of the status.
+
+    Online, update_from() consumes the rows of a MotorStateTable snapshot whose
+    sequence counter changed. Over a log, estimate_log() runs the same filter
+    on the recorded status updates.
+    """
+    def __init__(self, latency: float, alpha: float=ALPHA, beta: float=BETA, max_id: int=MAX_MOTOR_ID):
+        self.latency = latency
+        self.alpha = alpha
+        self.beta = beta
+        self.max_id = max_id
+        self.reset()
+
+    def reset(self):
+        """Forgets the estimates of every motor."""
+        n = self.max_id + 1
+        self.position = np.zeros(n)     # deg, at time
+        self.velocity = np.zeros(n)     # deg/s
+        self.time = np.full(n, np.nan)  # s, time of the last measurement (NaN before the first one)
+        self.seq = np.zeros(n, dtype=np.uint64)
+
+    def update(self, ids, positions, times, speeds=None):
+        """
+        Updates the estimates of the motors of ids (an integer array without
+        duplicates) with their measured positions (deg) handled at times (s,
+        time.perf_counter()) and their reported speeds (deg/s) if given.
+        """
+        ids = np.asarray(ids)
+        positions = np.asarray(positions, dtype=np.float64)
+        times = np.asarray(times, dtype=np.float64) - self.latency
+
+        previous = self.time[ids]
+        first = np.isnan(previous)
+        dt = times - previous
+        step = ~first & (dt > 0)
+
+        velocity = self.velocity[ids]
+        step_dt = np.where(step, dt, 0.0)
+        if speeds is None:
+            predicted = np.where(first, positions, self.position[ids] + velocity * step_dt)
+            innovation = positions - predicted
+            velocity = np.where(step, velocity + self.beta * innovation / np.where(step, dt, 1.0), velocity)
+        else:
+            # Trapezoidal integration of the speeds reported at both ends of the step
+            speeds = np.asarray(speeds, dtype=np.float64)
+            predicted = np.where(first, positions, self.position[ids] + 0.5 * (velocity + speeds) * step_dt)
+            innovation = positions - predicted
+            velocity = speeds
+        position = predicted + self.alpha * innovation
+
+        # Measurements with a repeated timestamp only correct the position
+        self.position[ids] = position
+        self.velocity[ids] = velocity
+        self.time[ids] = np.where(first | step, times, previous)
+
+    def update_from(self, table):
+        """
+        Updates the estimates with the rows of a state table (STATE_DTYPE,
+        indexed by motor ID, e.g. MotorStateTable.snapshot()) received since
+        the previous call. Returns the IDs of the updated motors.
+        """
+        ids = np.flatnonzero(table["seq"] > self.seq)
+        if len(ids):
+            rows = table[ids]
+            self.update(ids, rows["position"], rows["last_update"], rows["speed"])
+            self.seq[ids] = rows["seq"]
+        return ids
+
+    def predict(self, t, ids=None):
+        """
+        Returns the positions (deg) and velocities (deg/s) of the motors of ids
+        (all by default) extrapolated to time t (s, time.perf_counter(), a
+        scalar or one time per motor). Motors without measurement are NaN.
+        """
+        ids = slice(None) if ids is None else np.asarray(ids)
+        velocity = self.velocity[ids]
+        return self.position[ids] + velocity * (t - self.time[ids]), velocity.copy()
+
+
+def estimate_log(records, latency: float, alpha: float=ALPHA, beta: float=BETA, max_id: int=MAX_MOTOR_ID):
+    """
+    Runs a StateEstimator over recorded telemetry records (RECORD_DTYPE, in time
+    order) and returns the estimated positions and velocities of each record,
+    extrapolated to its time, i.e. compensated for statuses latency (s) old.
+    The filter steps through the k-th records of all the motors at once, so
+    that the loop runs once per status round rather than once per record.
+    """
+    estimator = StateEstimator(latency, alpha, beta, max_id)
+    positions = np.full(len(records), np.nan)
+    velocities = np.full(len(records), np.nan)
+
+    # Occurrence index of each record among the records of its motor
+    motor_ids = records["motor_id"].astype(np.int64)
+    order = np.argsort(motor_ids, kind="stable")
+    counts = np.bincount(motor_ids, minlength=max_id + 1)
+    starts = np.cumsum(counts) - counts
+    occurrence = np.empty(len(records), dtype=np.int64)
+    occurrence[order] = np.arange(len(records)) - starts[motor_ids[order]]
+
+    by_occurrence = np.argsort(occurrence, kind="stable")
+    bounds = np.searchsorted(occurrence[by_occurrence], np.arange(counts.max() + 1))
+    ids = motor_ids[by_occurrence]
+    times = records["time"][by_occurrence]
+    measured = records["position"][by_occurrence]
+    speeds = records["speed"][by_occurrence]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        estimator.update(ids[start:end], measured[start:end], times[start:end], speeds[start:end])
+        rows = by_occurrence[start:end]
+        positions[rows], velocities[rows] = estimator.predict(times[start:end], ids[start:end])
+    return positions, velocities
+
+
+if __name__ == "__main__":
+    from telemetry_log import RECORD_DTYPE
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validates the estimator on simulated sine motions.")
+    parser.add_argument("--rate", type=float, default=100, help="Status rate in Hz.")
+    parser.add_argument("--latency", type=float, default=0.0015, help="Age of the statuses in seconds.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Duration of each motion in seconds.")
+    args = parser.parse_args()
+
+    # Statuses of a sine motion, latency old, with positions and speeds quantized to 1 deg and 1 deg/s
+    print(f"{'amplitude (deg)':>15} {'frequency (Hz)':>14} {'raw rms (deg)':>13} {'estimated rms (deg)':>19}")
+    for amplitude, frequency in ((10, 0.2), (100, 1.0), (100, 3.0)):
+        omega = 2 * np.pi * frequency
+        times = np.arange(0, args.duration, 1 / args.rate)
+        records = np.zeros(len(times), dtype=RECORD_DTYPE)
+        records["time"] = times
+        records["motor_id"] = 1
+        records["position"] = np.round(amplitude * np.sin(omega * (times - args.latency)))
+        records["speed"] = np.round(amplitude * omega * np.cos(omega * (times - args.latency)))
+        truth = amplitude * np.sin(omega * times)
+        estimated, _ = estimate_log(records, args.latency)
+        settled = times >= 0.5     # Skips the convergence from the first status
+        raw_rms = np.sqrt(np.mean((records["position"] - truth)[settled] ** 2))
+        estimated_rms = np.sqrt(np.mean((estimated - truth)[settled] ** 2))
+        print(f"{amplitude:>15} {frequency:>14} {raw_rms:>13.3f} {estimated_rms:>19.3f}")
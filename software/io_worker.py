@@ -0,0 +1,402 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from multiprocessing import shared_memory, resource_tracker
+from motor_state import MAX_MOTOR_ID, STATE_DTYPE, MotorStateTable
+import numpy as np
+import subprocess
+import select
+import signal
+import sys
+import time
+import os
+
+START_TIMEOUT = 10.0    # s, time given to the worker to open the bus
+STOP_TIMEOUT = 2.0      # s, time given to the worker to exit once its pipe is closed
+WAIT_POLL = 0.0002      # s, polling period of the shared state while waiting for updates
+
+
+def command_dtype(max_id: int=MAX_MOTOR_ID):
+    """
+    Command published by the controller: positions (NaN for no command) and,
+    for each kind of request, the sequence number of its latest occurrence.
+    """
+    return np.dtype([
+        ("positions", np.float64, (max_id + 1,)),   # deg
+        ("max_speed", np.uint16),                   # deg/s
+        ("setpoint", np.uint64),                    # set with new positions
+        ("stop", np.uint64),                        # set to turn off every motor
+        ("read", np.uint64),                        # set to request the status of every motor
+    ], align=True)
+
+
+def state_dtype(max_id: int=MAX_MOTOR_ID):
+    """State published by the worker: the rows of its MotorStateTable."""
+    return np.dtype([("state", STATE_DTYPE, (max_id + 1,))], align=True)
+
+
+def buffer_dtype(payload_dtype):
+    """Layout of a DoubleBuffer: published sequence number and two slots, each tagged with its own sequence."""
+    slot = np.dtype([("seq", np.uint64), ("payload", payload_dtype)], align=True)
+    return np.dtype([("seq", np.uint64), ("slots", slot, (2,))], align=True)
+
+
+def exchange_dtype(max_id: int=MAX_MOTOR_ID):
+    """
+    Layout of the shared memory block between the controller and the I/O worker.
+    Fields are aligned, so that the 8-byte sequence numbers are read and written atomically.
+    """
+    return np.dtype([
+        ("ready", np.uint8),                        # set by the worker once the bus is open
+        ("applied", np.uint64),                     # sequence of the last command sent by the worker
+        ("command", buffer_dtype(command_dtype(max_id))),
+        ("state", buffer_dtype(state_dtype(max_id))),
+    ], align=True)
+
+
+class DoubleBuffer:
+    """
+    Single writer, multiple readers exchange of a fixed-size record in shared
+    memory, without locks. Version s is written into slot s % 2 (tagged with s
+    before its payload), and only then published as the current sequence
+    number. A reader copies the slot of the current version and accepts the
+    copy if the slot tag is unchanged afterwards, i.e. if the writer did not
+    start to overwrite this slot with version s + 2 in the meantime. The writer
+    never waits for the readers, and readers only retry if they were preempted
+    for two whole writes.
+
+    There are no explicit memory barriers: the design relies on the aligned
+    8-byte sequence numbers being accessed atomically and on the store and load
+    ordering of x86 (TSO), where stores are seen in program order by the other
+    cores. Weakly ordered CPUs (e.g. ARM) would need barriers around the tags.
+    """
+    def __init__(self, array):
+        self.array = array
+        self.seq = array["seq"]
+        self.slot_seq = array["slots"]["seq"]
+        self.payload = array["slots"]["payload"]
+        self.payload_dtype = self.payload.dtype
+
+    def write(self, **fields):
+        """Writes a new version with the given payload fields (the other fields are left as is) and publishes it."""
+        seq = int(self.seq) + 1
+        slot = seq & 1
+        self.slot_seq[slot] = seq
+        payload = self.payload[slot]
+        for name, value in fields.items():
+            payload[name] = value
+        self.seq[()] = seq
+        return seq
+
+    def read(self, out):
+        """
+        Copies the current version into out (a 0-d array of the payload dtype).
+        Returns its sequence number, or 0 if nothing was written yet.
+        """
+        while True:
+            seq = int(self.seq)
+            if seq == 0:
+                return 0
+            slot = seq & 1
+            out[()] = self.payload[slot]
+            if int(self.slot_seq[slot]) == seq:
+                return seq
+
+
+def exchange_arrays(buffer, max_id: int=MAX_MOTOR_ID):
+    """Maps the exchange layout on buffer. Returns the whole record and the command and state DoubleBuffers."""
+    exchange = np.ndarray((), dtype=exchange_dtype(max_id), buffer=buffer)
+    return exchange, DoubleBuffer(exchange["command"]), DoubleBuffer(exchange["state"])
+
+
+class SharedStateView:
+    """
+    Read-only MotorStateTable of the controller side, backed by the state
+    published by the I/O worker. Offers the read methods of MotorStateTable
+    (snapshot, positions, sequences, wait_for_updates), each on a consistent
+    copy of the table.
+    """
+    def __init__(self, buffer: DoubleBuffer, max_id: int=MAX_MOTOR_ID):
+        self.buffer = buffer
+        self.max_id = max_id
+        self.copy = np.zeros((), dtype=buffer.payload_dtype)
+
+    @property
+    def table(self):
+        self.buffer.read(self.copy)
+        return self.copy["state"]
+
+    def snapshot(self, ids=None):
+        table = self.table
+        return table.copy() if ids is None else table[ids]
+
+    def positions(self, ids):
+        return self.table["position"][ids]
+
+    def sequences(self, ids):
+        return self.table["seq"][ids]
+
+    def wait_for_updates(self, ids, since, timeout: float):
+        """
+        Polls the shared state until every motor of ids has a sequence counter
+        above the matching entry of since, or until timeout (s) expires.
+        Returns the list of motor IDs that were not updated in time.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            fresh = self.sequences(ids) > since
+            if fresh.all():
+                return []
+            if time.perf_counter() >= deadline:
+                return [id for id, ok in zip(ids, fresh) if not ok]
+            time.sleep(WAIT_POLL)
+
+
+class PublishedStateTable(MotorStateTable):
+    """
+    MotorStateTable of the worker side, publishing the whole table to the
+    state DoubleBuffer after every status update (from the listener thread,
+    its only writer).
+    """
+    def __init__(self, buffer: DoubleBuffer, max_id: int=MAX_MOTOR_ID):
+        super().__init__(max_id)
+        self.buffer = buffer
+
+    def write(self, motor_id: int, status):
+        super().write(motor_id, status)
+        self.buffer.write(state=self.table)
+
+
+class IOWorker:
+    """
+    CAN I/O in a separate process.
+    The worker process owns the bus, the RMDListener and the state table, and
+    exchanges setpoints and motor state with the controller through
+    DoubleBuffers in a multiprocessing.shared_memory block. Solving, rendering
+    or any other Python work of the controller therefore does not hold the GIL
+    of the process that receives and timestamps the frames. The worker is woken
+    up by a byte written on a pipe for each command, and exits when the pipe is
+    closed (including when the controller dies).
+
+    Like report.start_report, the worker is a fresh interpreter started with
+    subprocess rather than a multiprocessing child, which would inherit the
+    threads of the controller (fork) or re-run its script (spawn).
+    Status timestamps are taken with time.perf_counter() in the worker, which
+    is the same system-wide monotonic clock as in the controller on Linux.
+
+    Offers the main API of MotorGroup (set_positions, read_all, stop_motors,
+    state), from a single controller thread. Commands are latest-value: if the
+    controller publishes faster than the worker sends, intermediate position
+    setpoints are dropped, but the latest setpoint, stop and status requests are
+    never lost. Each kind of request is tagged with the sequence number of the
+    command that issued it, and the worker sends the new ones in that order
+    (e.g. a setpoint issued before a stop is never sent after it).
+    """
+    def __init__(self, ids, interface: str=None, channel=None, log_dir: str=None,
+                 realtime: bool=False, cpus=None, max_id: int=MAX_MOTOR_ID):
+        self.ids = list(ids)
+        self.interface = interface
+        self.channel = channel
+        self.log_dir = log_dir
+        self.realtime = realtime
+        self.cpus = cpus
+        self.max_id = max_id
+        self.shm = None
+        self.process = None
+        self.pipe = None
+        self.state = None
+
+    def __enter__(self):
+        self.shm = shared_memory.SharedMemory(create=True, size=exchange_dtype(self.max_id).itemsize)
+        try:
+            self._start()
+        except BaseException:
+            self._close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._close()
+
+    def _start(self):
+        self.exchange, self.command, state = exchange_arrays(self.shm.buf, self.max_id)
+        self.exchange[()] = np.zeros((), dtype=self.exchange.dtype)
+        self.state = SharedStateView(state, self.max_id)
+        self.next_command = np.zeros((), dtype=self.command.payload_dtype)
+        self.next_command["positions"] = np.nan
+
+        command = [sys.executable, os.path.abspath(__file__), self.shm.name, "--ids"] + [str(id) for id in self.ids]
+        if self.interface is not None:
+            command += ["--interface", self.interface]
+        if self.channel is not None:
+            command += ["--channel", str(self.channel)]
+        if self.log_dir is not None:
+            command += ["--log-dir", self.log_dir]
+        if self.realtime:
+            command += ["--realtime"]
+        if self.cpus is not None:
+            command += ["--cpus"] + [str(cpu) for cpu in self.cpus]
+        read_fd, self.pipe = os.pipe()
+        try:
+            self.process = subprocess.Popen(command + ["--fd", str(read_fd)], pass_fds=(read_fd,))
+        finally:
+            os.close(read_fd)
+
+        deadline = time.perf_counter() + START_TIMEOUT
+        while not self.exchange["ready"]:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"CAN I/O worker exited with code {self.process.returncode}")
+            if time.perf_counter() > deadline:
+                raise TimeoutError("CAN I/O worker did not open the bus in time")
+            time.sleep(0.01)
+
+    def _close(self):
+        if self.pipe is not None:
+            os.close(self.pipe)
+            self.pipe = None
+        if self.process is not None:
+            try:
+                self.process.wait(STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.process.terminate()
+                self.process.wait()
+            self.process = None
+        self.state = None
+        self.command = None
+        self.exchange = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def _publish(self, request: str):
+        command = self.next_command
+        command[request] = int(self.command.seq) + 1    # Sequence number of this command
+        seq = self.command.write(positions=command["positions"], max_speed=command["max_speed"],
+                                 setpoint=command["setpoint"], stop=command["stop"], read=command["read"])
+        os.write(self.pipe, b"\0")
+        return seq
+
+    def set_positions(self, positions: dict, max_speed_dps: int=3600):
+        """
+        Multi-turn absolute position control (Command 0xA4) of several motors.
+        positions maps motor IDs to angles in degrees. Returns the sequence
+        number of the command, once published to the worker.
+        """
+        command = self.next_command
+        command["positions"] = np.nan
+        for id, angle_deg in positions.items():
+            command["positions"][id] = angle_deg
+        command["max_speed"] = max_speed_dps
+        return self._publish("setpoint")
+
+    def stop_motors(self):
+        """Turns off every motor of the group (Command 0x80)."""
+        return self._publish("stop")
+
+    def read_all(self, timeout: float=0.01):
+        """
+        Broadcasts a status request (Command 0x9C) from the worker and waits
+        until all the motors replied or timeout (s) expired.
+        Returns a snapshot of the state rows (ordered as ids) and the missing IDs.
+        """
+        since = self.state.sequences(self.ids)
+        self._publish("read")
+        missing = self.state.wait_for_updates(self.ids, since, timeout)
+        return self.state.snapshot(self.ids), missing
+
+    @property
+    def applied(self):
+        """Sequence number of the last command sent on the bus by the worker."""
+        return int(self.exchange["applied"])
+
+
+def attach(name: str):
+    """
+    Attaches to the shared memory block created by the controller.
+    The block is unregistered from the resource tracker of this process, which
+    would otherwise unlink it when the worker exits (track=False from Python 3.13).
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def run_worker(name: str, fd: int, ids, interface: str=None, channel=None, log_dir: str=None,
+               max_id: int=MAX_MOTOR_ID):
+    """
+    Worker process main loop: opens the bus with a MotorGroup whose state is
+    published to the shared memory block name, then sends the commands of the
+    controller, woken up by the pipe fd, until the pipe is closed.
+    """
+    from can_bus import open_bus
+    from motor_group import MotorGroup
+    from telemetry_log import TelemetryRecorder
+    from contextlib import ExitStack
+
+    shm = attach(name)
+    exchange, commands, state_buffer = exchange_arrays(shm.buf, max_id)
+    command = np.zeros((), dtype=commands.payload_dtype)
+    ids = np.array(ids)
+
+    with ExitStack() as stack:
+        stack.callback(shm.close)
+        recorder = stack.enter_context(TelemetryRecorder(log_dir, max_id=max_id)) if log_dir is not None else None
+        bus = stack.enter_context(open_bus(interface, channel, sim_ids=ids.tolist()))
+        state = PublishedStateTable(state_buffer, max_id)
+        group = stack.enter_context(MotorGroup(bus, ids.tolist(), state=state, recorder=recorder))
+        exchange["ready"] = 1
+
+        applied = 0
+        done = {"setpoint": 0, "stop": 0, "read": 0}    # Sequence number of the last request of each kind sent
+        while True:
+            select.select([fd], [], [])
+            if not os.read(fd, 4096):
+                return  # Controller closed the pipe
+            seq = commands.read(command)
+            if seq == applied:
+                continue
+            requests = sorted((int(command[request]), request) for request in done
+                              if command[request] != done[request])
+            for request_seq, request in requests:
+                done[request] = request_seq
+                if request == "stop":
+                    for motor in group.motors.values():
+                        motor.stop_motor()
+                elif request == "read":
+                    group.broadcast.read_status()
+                else:
+                    positions = command["positions"][ids]
+                    commanded = ~np.isnan(positions)
+                    if commanded.any():
+                        group.set_positions(dict(zip(ids[commanded].tolist(), positions[commanded].tolist())),
+                                            int(command["max_speed"]))
+            applied = seq
+            exchange["applied"] = seq
+
+
+if __name__ == "__main__":
+    from control_loop import set_realtime
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CAN I/O worker process, started by IOWorker.")
+    parser.add_argument("name", help="Name of the shared memory block.")
+    parser.add_argument("--fd", type=int, required=True, help="Read end of the command notification pipe.")
+    parser.add_argument("--ids", type=int, nargs="+", required=True, help="Motor IDs.")
+    parser.add_argument("--interface", help="CAN interface, COCONUTS_CAN_INTERFACE by default.")
+    parser.add_argument("--channel", help="CAN channel, COCONUTS_CAN_CHANNEL by default.")
+    parser.add_argument("--log-dir", help="Telemetry log directory.")
+    parser.add_argument("--realtime", action="store_true", help="Run the worker with the SCHED_FIFO policy.")
+    parser.add_argument("--cpus", type=int, nargs="+", help="CPUs to pin the worker to.")
+    args = parser.parse_args()
+
+    # Ctrl+C is left to the controller, which decides how to stop the motors
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if args.realtime:
+        set_realtime(cpus=args.cpus)
+    elif args.cpus is not None:
+        os.sched_setaffinity(0, args.cpus)
+    run_worker(args.name, args.fd, args.ids, args.interface, args.channel, args.log_dir)
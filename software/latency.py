@@ -0,0 +1,210 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from motor_state import MAX_MOTOR_ID
+import math
+import time
+
+# Log-spaced histogram bins from 1 µs to 10 s
+MIN_LATENCY = 1e-6
+BINS_PER_DECADE = 50
+N_BINS = 7 * BINS_PER_DECADE
+
+# Interfaces whose message timestamps are taken by the kernel (or at send time
+# for the virtual bus) on the time.time() clock, and can be compared to the send time
+TIMESTAMPED_BUSES = ("SocketcanBus", "VirtualBus")
+
+
+def has_hardware_timestamps(bus):
+    """Returns whether the timestamps of the messages of bus can be compared to time.time()."""
+    return type(bus).__name__ in TIMESTAMPED_BUSES
+
+
+class LatencyHistogram:
+    """
+    Streaming histogram of latencies, with log-spaced bins (about 5 % wide).
+    Percentiles are estimated at the geometric center of their bin, the
+    maximum is exact.
+    """
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * N_BINS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency: float):
+        """Adds a latency sample (s)."""
+        if latency > MIN_LATENCY:
+            index = min(int(math.log10(latency / MIN_LATENCY) * BINS_PER_DECADE), N_BINS - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def percentile(self, q: float):
+        """Returns the q-th percentile (0-100) of the samples (s), or NaN without samples."""
+        if self.count == 0:
+            return math.nan
+        rank = q / 100 * self.count
+        cumulated = 0
+        for index, count in enumerate(self.counts):
+            cumulated += count
+            if cumulated >= rank and count:
+                return min(MIN_LATENCY * 10 ** ((index + 0.5) / BINS_PER_DECADE), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+
+class LatencyMonitor:
+    """
+    Command to reply round-trip instrumentation.
+    Outgoing frames are tagged with their send time per motor and opcode, and
+    the listener matches each reply to the pending tag of the same motor and
+    opcode. Round-trips are accumulated in one LatencyHistogram per
+    (motor ID, opcode). A request still pending when the next request with the
+    same opcode is sent counts as lost, and replies without pending request
+    (e.g. active replies) are only counted.
+
+    With hardware_timestamps, the reply time is the timestamp of the message
+    (kernel time with SocketCAN), and the delay between this timestamp and the
+    handling of the reply in Python is accumulated in the handoff histogram.
+    Otherwise the reply time is taken when the listener handles the frame.
+    """
+    def __init__(self, hardware_timestamps: bool=False, max_id: int=MAX_MOTOR_ID):
+        self.hardware_timestamps = hardware_timestamps
+        self.max_id = max_id
+        self.pending = [[0.0] * 256 for _ in range(max_id + 1)]     # Send time per motor and opcode, 0 if none
+        self.histograms = {}                                        # (motor ID, opcode) -> LatencyHistogram
+        self.sent = {}
+        self.lost = {}
+        self.unmatched = {}
+        self.handoff = LatencyHistogram()
+
+    def on_send(self, ids, opcode: int):
+        """Tags a request with opcode sent to the motors of ids (several for a broadcast)."""
+        now = time.time()
+        for id in ids:
+            if id > self.max_id:
+                continue
+            key = (id, opcode)
+            self.sent[key] = self.sent.get(key, 0) + 1
+            if self.pending[id][opcode]:
+                self.lost[key] = self.lost.get(key, 0) + 1
+            self.pending[id][opcode] = now
+
+    def on_failed(self, ids, opcode: int):
+        """Withdraws the tags of a request with opcode that could not be sent to the motors of ids."""
+        for id in ids:
+            if id > self.max_id:
+                continue
+            key = (id, opcode)
+            self.sent[key] -= 1
+            self.pending[id][opcode] = 0.0
+
+    def on_reply(self, motor_id: int, opcode: int, timestamp: float):
+        """Matches a reply with opcode of motor_id, received with the message timestamp, to its request."""
+        if motor_id > self.max_id:
+            return
+        received = time.time()
+        if self.hardware_timestamps:
+            self.handoff.add(received - timestamp)
+            received = timestamp
+
+        sent = self.pending[motor_id][opcode]
+        key = (motor_id, opcode)
+        if not sent:
+            self.unmatched[key] = self.unmatched.get(key, 0) + 1
+            return
+        self.pending[motor_id][opcode] = 0.0
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.add(received - sent)
+
+    def stats(self):
+        """
+        Returns a dict mapping (motor ID, opcode) to the number of requests sent,
+        replies matched, requests lost, unmatched replies and the p50, p99, mean
+        and max round-trips (s).
+        """
+        keys = sorted(set(self.sent) | set(self.histograms) | set(self.unmatched))
+        stats = {}
+        for key in keys:
+            histogram = self.histograms.get(key, LatencyHistogram())
+            stats[key] = {
+                "sent": self.sent.get(key, 0),
+                "received": histogram.count,
+                "lost": self.lost.get(key, 0),
+                "unmatched": self.unmatched.get(key, 0),
+                "p50": histogram.percentile(50),
+                "p99": histogram.percentile(99),
+                "mean": histogram.mean,
+                "max": histogram.max if histogram.count else math.nan,
+            }
+        return stats
+
+    def status_age(self):
+        """
+        Returns the estimated age (s) of a status when it is handled, i.e. half
+        the median round-trip over every motor and opcode, or NaN without replies.
+        """
+        merged = LatencyHistogram()
+        for histogram in self.histograms.values():
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.count += histogram.count
+            merged.max = max(merged.max, histogram.max)
+        return merged.percentile(50) / 2
+
+    def reset(self):
+        """Clears the histograms and counters."""
+        self.__init__(self.hardware_timestamps, self.max_id)
+
+    def print_stats(self):
+        """Prints the round-trip statistics of every motor and opcode."""
+        print(f"{'motor':>5} {'opcode':>6} {'sent':>8} {'recv':>8} {'lost':>6} {'unmatched':>9} "
+              f"{'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}")
+        for (motor_id, opcode), row in self.stats().items():
+            print(f"{motor_id:>5} {f'0x{opcode:02X}':>6} {row['sent']:>8} {row['received']:>8} {row['lost']:>6} "
+                  f"{row['unmatched']:>9} {row['p50'] * 1e3:>9.3f} {row['p99'] * 1e3:>9.3f} {row['max'] * 1e3:>9.3f}")
+        if self.hardware_timestamps and self.handoff.count:
+            print(f"Handoff to Python: p50={self.handoff.percentile(50) * 1e3:.3f} ms, "
+                  f"p99={self.handoff.percentile(99) * 1e3:.3f} ms, max={self.handoff.max * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    from can_bus import connect
+    from control_loop import ControlLoop
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Live command to reply latency dashboard.")
+    parser.add_argument("ids", type=int, nargs="+", help="Motor IDs.")
+    parser.add_argument("--dt", type=float, default=0.01, help="Polling period in seconds.")
+    parser.add_argument("--refresh", type=float, default=1.0, help="Dashboard refresh period in seconds.")
+    parser.add_argument("--unicast", action="store_true", help="Poll each motor with its own request instead of a broadcast.")
+    args = parser.parse_args()
+
+    monitor = LatencyMonitor()
+    with connect(args.ids, monitor=monitor) as group:
+        monitor.hardware_timestamps = has_hardware_timestamps(group.bus)
+        refresh = max(1, int(round(args.refresh / args.dt)))
+        try:
+            for k in ControlLoop(args.dt).run():
+                group.read_all(timeout=args.dt / 2, broadcast=not args.unicast)
+                if (k + 1) % refresh == 0:
+                    print(f"\n--- {time.strftime('%H:%M:%S')} ---")
+                    monitor.print_stats()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,125 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import numpy as np
+
+ROBOT_PATH = "hardware/benchmark"
+JOINT_SIGNS = {"knee_joint": -1.0, "ankle_joint": 1.0}
+MOTOR_SIGNS = {"knee_motor": -1.0, "ankle_motor": -1.0}
+MOTOR_IDS = {"knee_motor": 1, "ankle_motor": 2}
+MODES = ("both", "knee_only", "ankle_only", "zero")
+
+# Timing belt ratios
+KNEE_RATIO = -48/24     # knee_joint = KNEE_RATIO * knee_motor
+ANKLE_RATIO = 48/24     # ankle_passive = ANKLE_RATIO * ankle_motor + ANKLE_COUPLING * knee_joint
+ANKLE_COUPLING = -1.0
+
+
+def build_solver(robot_path: str=ROBOT_PATH):
+    """
+    Loads the one leg benchmark model and sets up its kinematics solver
+    (timing belts, closing crank loop and joint space task).
+    Returns the robot, the solver and the joint task.
+    """
+    import placo
+
+    robot = placo.RobotWrapper(robot_path)
+    solver = placo.KinematicsSolver(robot)
+
+    # Knee timing belt
+    knee_gear_task = solver.add_gear_task()
+    knee_gear_task.add_gear("knee_joint", "knee_motor", KNEE_RATIO)
+    knee_gear_task.configure("knee", "hard", 1.0)
+
+    # Ankle timing belt
+    ankle_gear_task = solver.add_gear_task()
+    ankle_gear_task.add_gear("ankle_passive", "ankle_motor", ANKLE_RATIO)
+    ankle_gear_task.add_gear("ankle_passive", "knee_joint", ANKLE_COUPLING)
+    ankle_gear_task.configure("ankle", "hard", 1.0)
+
+    # Closing crank kinematic loop
+    closing_task = solver.add_relative_position_task("closing_crank", "closing_foot", np.zeros(3))
+    closing_task.mask.set_axises("xz")
+    closing_task.configure("closing", "hard", 1.0)
+
+    # Controlling in joint space
+    joint_task = solver.add_joints_task()
+    joint_task.set_joints({"knee_joint": 0.0, "ankle_joint": 0.0})
+
+    solver.add_regularization_task(1e-6)
+
+    for i in range(10):
+        solver.solve(True)
+        robot.update_kinematics()
+
+    return robot, solver, joint_task
+
+
+def joint_targets(t: float, mode: str="both", omega: float=2.0, amplitude: float=1.0):
+    """
+    Returns the knee and ankle joint targets (rad) of the benchmark trajectory at time t.
+    t can also be an array of times. omega (rad/s) is the angular frequency of the
+    trajectory and amplitude scales its nominal range.
+    """
+    knee_target = (np.sin(omega*t - np.pi/2) * 0.85 + 0.85) * amplitude
+    ankle_target = np.sin(omega*t) * 0.7 * amplitude
+
+    if mode == "knee_only":
+        ankle_target = 0.0 * ankle_target
+    elif mode == "ankle_only":
+        knee_target = 0.0 * knee_target
+    elif mode == "zero":
+        knee_target = 0.0 * knee_target
+        ankle_target = 0.0 * ankle_target
+
+    return knee_target, ankle_target
+
+
+def trajectory_times(duration: float, dt: float):
+    """
+    Returns the sample times of a benchmark trajectory, starting at 0.
+    """
+    t = 0.0
+    times = [0.0]
+    while t < duration:
+        t += dt
+        times.append(t)
+    return np.array(times)
+
+
+def solve_step(robot, solver, joint_task, knee_target: float, ankle_target: float):
+    """
+    Solves the kinematics for the given joint targets (rad).
+    Returns the knee and ankle motor positions (deg).
+    """
+    joint_task.set_joints({
+        "knee_joint": JOINT_SIGNS["knee_joint"] * knee_target,
+        "ankle_joint": JOINT_SIGNS["ankle_joint"] * ankle_target
+    })
+
+    solver.solve(True)
+    robot.update_kinematics()
+    return robot.get_joint("knee_motor") * 180 / np.pi, robot.get_joint("ankle_motor") * 180 / np.pi
+
+
+def solve_trajectory(duration: float, dt: float, mode: str="both", robot_path: str=ROBOT_PATH):
+    """
+    Solves the benchmark trajectory in motor space.
+    Returns the motor trajectory as an array of (t, knee_motor, ankle_motor) rows
+    in degrees, and the matching robot configurations q.
+    """
+    robot, solver, joint_task = build_solver(robot_path)
+
+    motor_traj = [(0.0, 0.0, 0.0)]
+    qs = [robot.state.q.copy()]
+    for t in trajectory_times(duration, dt)[1:]:
+        knee_motor, ankle_motor = solve_step(robot, solver, joint_task, *joint_targets(t, mode))
+        motor_traj.append((t, knee_motor, ankle_motor))
+        qs.append(robot.state.q.copy())
+
+    return np.array(motor_traj), np.array(qs)
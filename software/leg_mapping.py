@@ -0,0 +1,140 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from leg import (
+    ROBOT_PATH, JOINT_SIGNS, KNEE_RATIO, ANKLE_RATIO, ANKLE_COUPLING,
+    build_solver, joint_targets, trajectory_times, solve_trajectory,
+)
+from trajectory_cache import CACHE_DIR, CACHE_VERSION, urdf_hash
+import numpy as np
+import os
+
+ANKLE_LIMIT = 1.2       # Half range of the tabulated ankle joint (rad)
+N_SAMPLES = 1201        # Number of tabulated ankle joint values (odd, so that 0 is sampled)
+SOLVER_ITERATIONS = 5   # Solver iterations per tabulated value
+TOLERANCE = 0.1         # Default validation tolerance (deg)
+
+
+class LegMapping:
+    """
+    Fast joint to motor space mapping of the one leg benchmark.
+    The timing belts are linear, and the four-bar closing loop only depends
+    on the ankle joint, as both its cranks hang from the tibia. The four-bar
+    is tabulated once from the placo model (ankle_passive as a function of
+    ankle_joint) and interpolated, so that whole arrays of joint targets are
+    converted in one vectorized call.
+    """
+    def __init__(self, ankle_grid, ankle_passive):
+        self.ankle_grid = ankle_grid
+        self.ankle_passive = ankle_passive
+
+    @classmethod
+    def fit(cls, robot_path: str=ROBOT_PATH, limit: float=ANKLE_LIMIT, n: int=N_SAMPLES):
+        """
+        Tabulates the four-bar by sweeping the ankle joint with the kinematics solver.
+        """
+        robot, solver, joint_task = build_solver(robot_path)
+        ankle_grid = np.linspace(-limit, limit, n)
+        ankle_passive = np.zeros(n)
+
+        # Sweeping up from 0 then all the way down keeps the solver warm-started
+        for i in list(range(n // 2, n)) + list(range(n - 1, -1, -1)):
+            joint_task.set_joints({"knee_joint": 0.0, "ankle_joint": ankle_grid[i]})
+            for _ in range(SOLVER_ITERATIONS):
+                solver.solve(True)
+                robot.update_kinematics()
+            ankle_passive[i] = robot.get_joint("ankle_passive")
+
+        return cls(ankle_grid, ankle_passive)
+
+    def joints_to_motors(self, knee_target, ankle_target):
+        """
+        Converts knee and ankle joint targets (rad, as returned by joint_targets)
+        to knee and ankle motor positions (deg). Accepts scalars or arrays.
+        Raises ValueError if an ankle target is outside of the tabulated range,
+        rather than clamping it silently.
+        """
+        knee_joint = JOINT_SIGNS["knee_joint"] * np.asarray(knee_target, dtype=np.float64)
+        ankle_joint = JOINT_SIGNS["ankle_joint"] * np.asarray(ankle_target, dtype=np.float64)
+        low, high = self.ankle_grid[0], self.ankle_grid[-1]
+        if np.any((ankle_joint < low) | (ankle_joint > high)):
+            raise ValueError(f"Ankle joint target out of the tabulated range [{low:.3f}, {high:.3f}] rad "
+                             f"(min {np.min(ankle_joint):.3f}, max {np.max(ankle_joint):.3f})")
+        ankle_passive = np.interp(ankle_joint, self.ankle_grid, self.ankle_passive)
+
+        knee_motor = knee_joint / KNEE_RATIO
+        ankle_motor = (ankle_passive - ANKLE_COUPLING * knee_joint) / ANKLE_RATIO
+        return np.degrees(knee_motor), np.degrees(ankle_motor)
+
+    def motor_trajectory(self, duration: float, dt: float, mode: str="both", omega: float=2.0, amplitude: float=1.0):
+        """
+        Returns the motor trajectory of a benchmark trajectory as an array of
+        (t, knee_motor, ankle_motor) rows in degrees, like solve_trajectory.
+        """
+        t = trajectory_times(duration, dt)
+        knee_motor, ankle_motor = self.joints_to_motors(*joint_targets(t, mode, omega, amplitude))
+        motor_traj = np.column_stack((t, knee_motor, ankle_motor))
+        motor_traj[0, 1:] = 0.0  # Starts from the zero configuration, as solve_trajectory
+        return motor_traj
+
+    def validate(self, duration: float, dt: float, mode: str="both", tolerance: float=TOLERANCE,
+                 robot_path: str=ROBOT_PATH):
+        """
+        Compares the mapping with the KinematicsSolver on a benchmark trajectory.
+        Returns the maximum error (deg) of each motor and whether both are within tolerance.
+        """
+        reference, _ = solve_trajectory(duration, dt, mode, robot_path)
+        mapped = self.motor_trajectory(duration, dt, mode)
+        error = np.max(np.abs(mapped[:, 1:] - reference[:, 1:]), axis=0)
+        return error, bool(np.all(error <= tolerance))
+
+
+def load_mapping(robot_path: str=ROBOT_PATH, cache_dir: str=CACHE_DIR):
+    """
+    Returns the mapping of the robot, fitted once and then loaded from the cache.
+    The cache key covers the robot URDF.
+    """
+    key = urdf_hash(robot_path)[:16]
+    path = os.path.join(cache_dir, f"leg_mapping_v{CACHE_VERSION}_{key}.npz")
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return LegMapping(data["ankle_grid"], data["ankle_passive"])
+
+    print("Fitting the four-bar mapping...")
+    mapping = LegMapping.fit(robot_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, ankle_grid=mapping.ankle_grid, ankle_passive=mapping.ankle_passive)
+    os.replace(tmp_path, path)
+    return mapping
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Validate the fast joint to motor mapping against the kinematics solver.")
+    parser.add_argument("--duration", type=float, default=4*np.pi, help="Duration of the validation trajectories in seconds.")
+    parser.add_argument("--dt", type=float, default=0.02, help="Time step of the validation trajectories in seconds.")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Maximum allowed error in degrees.")
+    args = parser.parse_args()
+
+    mapping = load_mapping()
+
+    ok = True
+    for mode in ("both", "knee_only", "ankle_only"):
+        start = time.perf_counter()
+        mapping.motor_trajectory(args.duration, args.dt, mode)
+        elapsed = time.perf_counter() - start
+        error, valid = mapping.validate(args.duration, args.dt, mode, args.tolerance)
+        ok = ok and valid
+        print(f"{mode:>10}: knee error {error[0]:.4f} deg, ankle error {error[1]:.4f} deg, "
+              f"mapped in {elapsed * 1e3:.2f} ms {'OK' if valid else 'FAILED'}")
+
+    if not ok:
+        raise SystemExit(1)
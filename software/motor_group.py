@@ -0,0 +1,137 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import can
+from ctypes import c_ubyte
+from rmd_codec import COMMAND_BASE, BROADCAST_ID, CMD_POSITION
+from rmd_motor import RMDMotor, RMDMotorBroadcast, RMDListener
+from motor_state import MotorStateTable
+
+
+def burst_sender(bus, channel=None, monitor=None, broadcast_ids=()):
+    """
+    Returns a function sending a list of messages back-to-back on bus.
+    On a CANalyst-II bus, the frames are handed to the adapter in one USB
+    transfer (on channel, which can be omitted if the bus has a single one).
+    Other backends send them one after the other, and the tags of the frames
+    whose send fails are withdrawn from monitor (a LatencyMonitor) if given,
+    broadcast frames being tagged for the motors of broadcast_ids.
+    """
+    device = getattr(bus, "device", None)
+    if type(bus).__name__ == "CANalystIIBus" and device is not None and (channel is not None or len(bus.channels) == 1):
+        import canalystii
+        if channel is None:
+            channel = bus.channels[0]
+
+        def send_burst(messages):
+            raw_messages = [
+                canalystii.Message(msg.arbitration_id, 0, 1, 0, msg.is_remote_frame, msg.is_extended_id,
+                                   msg.dlc, (c_ubyte * 8)(*msg.data))
+                for msg in messages
+            ]
+            device.send(channel, raw_messages)
+        return send_burst
+
+    def send_burst(messages):
+        for msg in messages:
+            try:
+                bus.send(msg)
+            except can.CanError as e:
+                print(f"CAN Error: {e}")
+                if monitor is not None:
+                    arbitration_id = msg.arbitration_id
+                    ids = broadcast_ids if arbitration_id == BROADCAST_ID else (arbitration_id - COMMAND_BASE,)
+                    monitor.on_failed(ids, msg.data[0])
+    return send_burst
+
+
+class MotorGroup:
+    """
+    Set of RMD motors sharing a CAN bus, a listener and a state table.
+    Can be used as a context manager to run the listener on a can.Notifier.
+    If a TelemetryRecorder is given, every status reply is logged along with
+    the last position sent to the motor, and if a LatencyMonitor is given,
+    every request is tagged and matched to its reply. If a TransmitScheduler
+    is given, all the frames of the group are sent through it.
+    """
+    def __init__(self, bus, ids, state=None, recorder=None, monitor=None, scheduler=None):
+        self.bus = bus
+        self.ids = list(ids)
+        self.motors = {id: RMDMotor(bus, id) for id in self.ids}
+        self.broadcast = RMDMotorBroadcast(bus)
+        self.state = state if state is not None else MotorStateTable()
+        self.recorder = recorder
+        self.monitor = monitor
+        if monitor is not None:
+            for motor in self.motors.values():
+                motor.attach_monitor(monitor)
+            self.broadcast.attach_monitor(monitor, self.ids)
+        self.scheduler = scheduler
+        if scheduler is not None:
+            for motor in self.motors.values():
+                motor.attach_scheduler(scheduler)
+            self.broadcast.attach_scheduler(scheduler)
+            if monitor is not None:
+                scheduler.attach_monitor(monitor, self.ids)
+        self.listener = RMDListener(self.motors, self.state, recorder, monitor)
+        self.notifier = None
+        if scheduler is not None:
+            self.send_burst = scheduler.send_burst
+        else:
+            self.send_burst = burst_sender(bus, monitor=monitor, broadcast_ids=self.ids)
+
+    def __enter__(self):
+        self.notifier = can.Notifier(self.bus, [self.listener])
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.notifier.stop()
+        self.notifier = None
+
+    def __getitem__(self, id):
+        return self.motors[id]
+
+    def read_all(self, timeout: float=0.01, broadcast: bool=True):
+        """
+        Requests the status of every motor of the group (Command 0x9C) and waits
+        until all of them replied or timeout (s) expired.
+        With broadcast, a single request is sent on 0x280, otherwise one request
+        per motor is sent as a burst.
+        Returns a snapshot of the state rows of the group (ordered as ids) and
+        the list of motor IDs that did not reply in time.
+        """
+        since = self.state.sequences(self.ids)
+        if broadcast:
+            self.broadcast.read_status()
+        else:
+            for motor in self.motors.values():
+                motor.read_status()
+        missing = self.state.wait_for_updates(self.ids, since, timeout)
+        return self.state.snapshot(self.ids), missing
+
+    def stop_motors(self):
+        """Turns off every motor of the group (Command 0x80)."""
+        for motor in self.motors.values():
+            motor.stop_motor()
+
+    def set_positions(self, positions: dict, max_speed_dps: int=3600):
+        """
+        Multi-turn absolute position control (Command 0xA4) of several motors.
+        positions maps motor IDs to angles in degrees. All the frames are encoded
+        first and then sent back-to-back, so that the setpoints of one control
+        tick reach the motors nearly simultaneously.
+        """
+        messages = [
+            self.motors[id].encode_position(angle_deg, max_speed_dps)
+            for id, angle_deg in positions.items()
+        ]
+        if self.recorder is not None:
+            self.recorder.set_targets(positions)
+        if self.monitor is not None and self.scheduler is None:
+            self.monitor.on_send(positions, CMD_POSITION)
+        self.send_burst(messages)
@@ -0,0 +1,84 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import numpy as np
+import threading
+import time
+
+MAX_MOTOR_ID = 32
+
+STATE_DTYPE = np.dtype([
+    ("temp", np.int16),           # °C
+    ("current", np.float64),      # A
+    ("speed", np.float64),        # deg/s
+    ("position", np.float64),     # deg
+    ("last_update", np.float64),  # s
+    ("seq", np.uint64),           # number of status updates received
+])
+
+
+class MotorStateTable:
+    """
+    Bus-level store holding the last known state of every motor.
+    One row per motor ID, written in place by the RMDListener and read
+    back by controllers as a consistent snapshot of all the joints.
+    """
+    def __init__(self, max_id: int=MAX_MOTOR_ID):
+        self.max_id = max_id
+        self.table = np.zeros(max_id + 1, dtype=STATE_DTYPE)
+        self.lock = threading.Condition(threading.Lock())
+
+    def write(self, motor_id: int, status):
+        """
+        Writes a motor status record into the row of motor_id.
+        """
+        with self.lock:
+            self.table[motor_id] = (status.temp, status.current, status.speed, status.position,
+                                    status.last_update, self.table["seq"][motor_id] + 1)
+            self.lock.notify_all()
+
+    def snapshot(self, ids=None):
+        """
+        Returns a copy of the table (or of the rows of the sequence of motor
+        IDs ids), taken atomically with respect to the listener thread.
+        """
+        with self.lock:
+            if ids is None:
+                return self.table.copy()
+            return self.table[ids]
+
+    def positions(self, ids):
+        """
+        Returns the last known positions (deg) of the sequence of motor IDs ids.
+        """
+        with self.lock:
+            return self.table["position"][ids]
+
+    def sequences(self, ids):
+        """
+        Returns the update counters of the sequence of motor IDs ids.
+        """
+        with self.lock:
+            return self.table["seq"][ids]
+
+    def wait_for_updates(self, ids, since, timeout: float):
+        """
+        Blocks until every motor of ids has a sequence counter above the
+        matching entry of since, or until timeout (s) expires.
+        Returns the list of motor IDs that were not updated in time.
+        """
+        deadline = time.perf_counter() + timeout
+        with self.lock:
+            while True:
+                fresh = self.table["seq"][ids] > since
+                if fresh.all():
+                    return []
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return [id for id, ok in zip(ids, fresh) if not ok]
+                self.lock.wait(remaining)
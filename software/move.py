@@ -6,9 +6,7 @@
 
 #     http://www.apache.org/licenses/LICENSE-2.0
 
-import can
-import can.interfaces.canalystii as canalystii
-from rmd_motor import BITRATE, RMDMotor, RMDListener
+from can_bus import connect
 import time
 import sys
 
@@ -20,16 +18,10 @@ if len(sys.argv) <= 1:
 position = float(sys.argv[1])
 ids = [int(arg) for arg in sys.argv[2:]]
 
-with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE, receive_own_messages=False) as bus:
-    motors = {}
-    for id in ids:
-        motors[id] = RMDMotor(bus, id)
-
-    listener = RMDListener(motors)
-    with can.Notifier(bus, [listener]):
-        for id, motor in motors.items():
-            for _ in range(3):
-                motor.set_position(position, max_speed_dps=500)
-                time.sleep(0.3)
-            motor.stop_motor()
-            time.sleep(0.3)
\ No newline at end of file
+with connect(ids) as group:
+    for id, motor in group.motors.items():
+        for _ in range(3):
+            motor.set_position(position, max_speed_dps=500)
+            time.sleep(0.3)
+        motor.stop_motor()
+        time.sleep(0.3)
\ No newline at end of file
@@ -0,0 +1,219 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import can
+from rmd_codec import FRAME_BITS, COMMAND_BASE, CMD_POSITION, pack_position
+from rmd_motor import BITRATE, RMDMotor, RMDMotorBroadcast, RMDListener
+from motor_state import MotorStateTable
+from motor_group import burst_sender
+from can_bus import bus_config, open_bus
+from contextlib import ExitStack
+import queue
+import threading
+
+
+def split_ids(ids, channels):
+    """
+    Spreads motor IDs over channels in contiguous, balanced blocks.
+    Returns a dict mapping each channel to its list of motor IDs.
+    """
+    ids = list(ids)
+    channels = list(channels)
+    shards = {}
+    start = 0
+    for k, channel in enumerate(channels):
+        size = len(ids) // len(channels) + (1 if k < len(ids) % len(channels) else 0)
+        shards[channel] = ids[start:start + size]
+        start += size
+    return shards
+
+
+def bus_utilization(n_motors: int, rate_hz: float, frames_per_cycle: int=2, bitrate: int=BITRATE):
+    """
+    Returns the fraction of a CAN channel used by n_motors exchanging
+    frames_per_cycle frames (e.g. request + reply) at rate_hz.
+    """
+    return n_motors * rate_hz * frames_per_cycle * FRAME_BITS / bitrate
+
+
+def capacity_report(shards: dict, rate_hz: float, frames_per_cycle: int=2, bitrate: int=BITRATE):
+    """
+    Returns the utilization of each channel of shards (channel -> motor IDs).
+    """
+    return {
+        channel: bus_utilization(len(ids), rate_hz, frames_per_cycle, bitrate)
+        for channel, ids in shards.items()
+    }
+
+
+class ShardSender(threading.Thread):
+    """
+    Transmit thread of one channel. Position batches are encoded and sent on
+    this thread, so that the channels are written concurrently.
+    The sender encodes into its own preallocated message per motor, since the
+    messages of the RMDMotor objects can be rewritten meanwhile by direct
+    commands from the controller thread.
+    """
+    def __init__(self, motors: dict, send_burst, monitor=None):
+        super().__init__(name="CAN shard sender", daemon=True)
+        self.frames = {
+            id: can.Message(arbitration_id=id + COMMAND_BASE, data=bytearray(8),
+                            is_extended_id=False, channel=motor.channel)
+            for id, motor in motors.items()
+        }
+        self.send_burst = send_burst
+        self.monitor = monitor
+        self.queue = queue.SimpleQueue()
+
+    def run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            positions, max_speed_dps = batch
+            if self.monitor is not None:
+                self.monitor.on_send(positions, CMD_POSITION)
+            frames = self.frames
+            messages = []
+            for id, angle_deg in positions.items():
+                msg = frames[id]
+                pack_position(msg.data, angle_deg, max_speed_dps)
+                messages.append(msg)
+            self.send_burst(messages)
+
+    def stop(self):
+        self.queue.put(None)
+        self.join()
+
+
+class MultiBusGroup:
+    """
+    Motor group spread over several CAN channels.
+    Each bus object receives on its own can.Notifier thread (one Notifier per
+    bus), and each channel transmits on its own ShardSender thread, while commands and state go through one API and
+    one MotorStateTable. All status timestamps come from time.perf_counter(),
+    so they are aligned across channels.
+    On the CANalyst-II, both channels are opened on a single bus object and
+    frames are routed with their channel attribute. Other interfaces open one
+    bus per channel (e.g. can0 and can1 with SocketCAN).
+    """
+    def __init__(self, shards: dict, interface: str=None, state=None, recorder=None, monitor=None):
+        self.shards = {channel: list(ids) for channel, ids in shards.items()}
+        self.ids = [id for ids in self.shards.values() for id in ids]
+        self.interface, _ = bus_config(interface, None)
+        self.state = state if state is not None else MotorStateTable()
+        self.recorder = recorder
+        self.monitor = monitor
+        self.motors = {}
+        self.broadcasts = {}
+        self.channel_of = {}
+        self.senders = {}
+        self.stack = None
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        try:
+            self._open()
+        except BaseException:
+            self.stack.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stack.close()
+        self.stack = None
+
+    def _open(self):
+        if self.interface == "canalystii":
+            bus = self.stack.enter_context(open_bus(self.interface, list(self.shards)))
+            buses = {channel: bus for channel in self.shards}
+        else:
+            buses = {
+                channel: self.stack.enter_context(open_bus(self.interface, channel, sim_ids=ids))
+                for channel, ids in self.shards.items()
+            }
+
+        listeners = {}
+        for channel, ids in self.shards.items():
+            bus = buses[channel]
+            frame_channel = channel if self.interface == "canalystii" else None
+            motors = {id: RMDMotor(bus, id, frame_channel) for id in ids}
+            self.motors.update(motors)
+            for motor_id in ids:
+                self.channel_of[motor_id] = channel
+            self.broadcasts[channel] = RMDMotorBroadcast(bus, frame_channel)
+            if self.monitor is not None:
+                for motor in motors.values():
+                    motor.attach_monitor(self.monitor)
+                self.broadcasts[channel].attach_monitor(self.monitor, ids)
+
+            if bus not in listeners:
+                listeners[bus] = RMDListener({}, self.state, self.recorder, self.monitor)
+            for motor in motors.values():
+                listeners[bus].add_motor(motor)
+
+            sender = ShardSender(motors, burst_sender(bus, frame_channel, self.monitor, ids), self.monitor)
+            sender.start()
+            self.stack.callback(sender.stop)
+            self.senders[channel] = sender
+
+        for bus, listener in listeners.items():
+            notifier = can.Notifier(bus, [listener])
+            self.stack.callback(notifier.stop)
+
+    def __getitem__(self, id):
+        return self.motors[id]
+
+    def set_positions(self, positions: dict, max_speed_dps: int=3600):
+        """
+        Multi-turn absolute position control (Command 0xA4) of motors on any channel.
+        The batch is split per channel and handed to the sender threads, which
+        transmit concurrently. Returns without waiting for the frames to be sent.
+        """
+        if self.recorder is not None:
+            self.recorder.set_targets(positions)
+        batches = {channel: {} for channel in self.shards}
+        for id, angle_deg in positions.items():
+            batches[self.channel_of[id]][id] = angle_deg
+        for channel, batch in batches.items():
+            if batch:
+                self.senders[channel].queue.put((batch, max_speed_dps))
+
+    def read_all(self, timeout: float=0.01):
+        """
+        Broadcasts a status request (Command 0x9C) on every channel and waits
+        until all the motors replied or timeout (s) expired.
+        Returns a snapshot of the state rows (ordered as ids) and the missing IDs.
+        """
+        since = self.state.sequences(self.ids)
+        for broadcast in self.broadcasts.values():
+            broadcast.read_status()
+        missing = self.state.wait_for_updates(self.ids, since, timeout)
+        return self.state.snapshot(self.ids), missing
+
+    def capacity(self, rate_hz: float, frames_per_cycle: int=2):
+        """Returns the utilization of each channel at rate_hz."""
+        return capacity_report(self.shards, rate_hz, frames_per_cycle)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CAN bus capacity calculator for RMD motors.")
+    parser.add_argument("--motors", type=int, default=12, help="Number of motors.")
+    parser.add_argument("--channels", type=int, default=2, help="Number of CAN channels.")
+    parser.add_argument("--rate", type=float, nargs="+", default=[100, 200, 500], help="Control rates in Hz.")
+    parser.add_argument("--frames", type=int, default=2, help="Frames per motor and per cycle (request + reply).")
+    args = parser.parse_args()
+
+    shards = split_ids(range(1, args.motors + 1), range(args.channels))
+    for rate in args.rate:
+        print(f"{rate:.0f} Hz:")
+        for channel, utilization in capacity_report(shards, rate, args.frames).items():
+            flag = " (OVERLOADED)" if utilization > 1.0 else ""
+            print(f"  Channel {channel}: {len(shards[channel])} motors, {utilization * 100:5.1f} % bus load{flag}")
@@ -6,10 +6,8 @@
 
 #     http://www.apache.org/licenses/LICENSE-2.0
 
-import can
-import can.interfaces.canalystii as canalystii
-from rmd_motor import BITRATE, RMDMotor, RMDListener
-import time
+from can_bus import connect_async
+import asyncio
 import sys
 
 if len(sys.argv) <= 1:
@@ -19,13 +17,14 @@ if len(sys.argv) <= 1:
 
 ids = [int(arg) for arg in sys.argv[1:]]
 
-with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE, receive_own_messages=False) as bus:
-    motors = {}
-    for id in ids:
-        motors[id] = RMDMotor(bus, id)
 
-    listener = RMDListener(motors)
-    with can.Notifier(bus, [listener]):
-        for id, motor in motors.items():
-            motor.ping()
-            time.sleep(0.3)
\ No newline at end of file
+async def main():
+    async with connect_async(ids) as client:
+        replies = await client.map("ping")
+    for id, reply in replies.items():
+        if isinstance(reply, Exception):
+            print(f"Motor ID {id} did not respond to ping.")
+        else:
+            print(f"Motor ID {id} responded to ping.")
+
+asyncio.run(main())
@@ -0,0 +1,112 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import can
+from rmd_codec import COMMAND_BASE, CMD_POSITION
+from leg import MOTOR_SIGNS, MOTOR_IDS
+from control_loop import ControlLoop, SPIN
+import numpy as np
+
+LEG_MOTORS = ("knee_motor", "ankle_motor")   # Column order of the benchmark motor trajectories
+
+
+def frame_dtype(n_motors: int):
+    """Row layout of a playback table: tick time and one 8-byte frame per motor."""
+    return np.dtype([("time", "<f8"), ("frames", np.uint8, (n_motors, 8))])
+
+
+def encode_positions(angles_deg, max_speed_dps: int=3600):
+    """
+    Encodes an array of angles (deg) into position frames (Command 0xA4), in a
+    single vectorized pass. Returns a uint8 array with a trailing axis of 8 bytes.
+    Angles are truncated to 0.01 deg, like pack_position.
+    """
+    angles = np.asarray(angles_deg, dtype=np.float64)
+    frames = np.zeros(angles.shape + (8,), dtype=np.uint8)
+    frames[..., 0] = CMD_POSITION
+    frames[..., 2:4] = np.array([max_speed_dps], dtype="<u2").view(np.uint8)
+    frames[..., 4:8] = (angles * 100).astype("<i4")[..., None].view(np.uint8)
+    return frames
+
+
+class Playback:
+    """
+    Position command stream compiled ahead of time.
+    The table holds one row per tick: its time (s, from the start of the
+    playback) and the ready-to-send position frames of every motor, in one
+    contiguous uint8 buffer. At playback, each tick only copies the frames
+    into preallocated messages and sends them as a burst, without any float
+    math, sign handling or packing in the timed loop.
+    """
+    def __init__(self, ids, table, targets):
+        self.ids = list(ids)
+        self.table = table
+        self.targets = targets  # Commanded angles (deg), one row per tick, as encoded
+
+    @classmethod
+    def compile(cls, times, positions, ids, max_speed_dps: int=3600):
+        """
+        Compiles motor positions (deg, one row per time and one column per motor
+        ID of ids, in the motor frame) into a playback.
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        table = np.zeros(len(times), dtype=frame_dtype(len(ids)))
+        table["time"] = times
+        table["frames"] = encode_positions(positions, max_speed_dps)
+        targets = np.trunc(positions * 100) / 100
+        return cls(ids, table, targets)
+
+    @classmethod
+    def from_trajectory(cls, motor_traj, max_speed_dps: int=3600, motors=LEG_MOTORS,
+                        motor_signs=MOTOR_SIGNS, motor_ids=MOTOR_IDS):
+        """
+        Compiles a benchmark motor trajectory ((t, knee_motor, ankle_motor) rows
+        in degrees) with the motor signs and IDs of the leg.
+        """
+        signs = np.array([motor_signs[name] for name in motors])
+        ids = [motor_ids[name] for name in motors]
+        return cls.compile(motor_traj[:, 0], motor_traj[:, 1:] * signs, ids, max_speed_dps)
+
+    def __len__(self):
+        return len(self.table)
+
+    def play(self, group, spin: float=SPIN, realtime: bool=False):
+        """
+        Streams the table to the motors of group (a MotorGroup) against the tick
+        deadlines. The recorder and latency monitor of the group are updated
+        as with set_positions. Returns the ControlLoop, for its jitter statistics.
+        """
+        times = self.table["time"]
+        dt = float(times[1] - times[0]) if len(times) > 1 else 0.0
+        loop = ControlLoop(dt, spin, realtime)
+
+        messages = [
+            can.Message(arbitration_id=COMMAND_BASE + id, data=bytearray(8), is_extended_id=False,
+                        channel=group.motors[id].channel)
+            for id in self.ids
+        ]
+        row_size = self.table.dtype.itemsize
+        offsets = [self.table.dtype.fields["frames"][1] + 8 * j for j in range(len(self.ids))]
+        buffer = memoryview(self.table.view(np.uint8)).cast("B")
+        slots = list(zip(messages, offsets))
+        send_burst = group.send_burst
+        recorder = group.recorder
+        monitor = group.monitor if group.scheduler is None else None    # The scheduler tags the frames itself
+        ids = np.array(self.ids)
+        targets = self.targets
+
+        for k in loop.run_at(times):
+            base = k * row_size
+            for msg, offset in slots:
+                msg.data[:] = buffer[base + offset:base + offset + 8]
+            if recorder is not None:
+                recorder.targets[ids] = targets[k]
+            if monitor is not None:
+                monitor.on_send(self.ids, CMD_POSITION)
+            send_burst(messages)
+        return loop
@@ -6,10 +6,9 @@
 
 #     http://www.apache.org/licenses/LICENSE-2.0
 
-import can
-import can.interfaces.canalystii as canalystii
-from rmd_motor import BITRATE, RMDMotor, RMDListener
-import time
+from can_bus import connect_async
+from rmd_codec import format_pid
+import asyncio
 import sys
 
 if len(sys.argv) <= 1:
@@ -19,15 +18,22 @@ if len(sys.argv) <= 1:
 
 ids = [int(arg) for arg in sys.argv[1:]]
 
-with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE, receive_own_messages=False) as bus:
-    motors = {}
+
+async def main():
+    async with connect_async(ids) as client:
+        accelerations, pids = await asyncio.gather(client.map("read_accelerations"), client.map("read_pid"))
+
     for id in ids:
-        motors[id] = RMDMotor(bus, id)
-
-    listener = RMDListener(motors)
-    with can.Notifier(bus, [listener]):
-        for id, motor in motors.items():
-            motor.read_acceleration()
-            time.sleep(0.1)
-            motor.read_pid()
-            time.sleep(0.1)
\ No newline at end of file
+        if isinstance(accelerations[id], Exception):
+            print(f"Motor ID {id} acceleration: {accelerations[id]}")
+        else:
+            for setting in accelerations[id]:
+                print(f"Motor ID {id} {setting.name}: {setting.value}")
+
+        gains = pids[id]
+        if isinstance(gains, Exception):
+            print(f"Motor ID {id} PID parameters: {gains}")
+            continue
+        print(format_pid(gains))
+
+asyncio.run(main())
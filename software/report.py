@@ -0,0 +1,159 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from telemetry_log import TelemetryLog
+from estimator import estimate_log
+import numpy as np
+import subprocess
+import html
+import sys
+import os
+
+REPORT_DIR = "report"   # Subdirectory of the log directory
+
+
+def motor_summary(log, records, estimated=None):
+    """
+    Returns the summary of the records of one motor: number of records, duration,
+    reply rate, and RMS/max tracking errors where a target was commanded, also
+    computed with the estimated positions of the records if given.
+    """
+    summary = {"records": len(records), "duration": 0.0, "rate": 0.0, "rms_error": None, "max_error": None,
+               "rms_error_estimated": None, "max_temp": int(records["temp"].max()) if len(records) else None}
+    if len(records) >= 2:
+        t = log.elapsed(records)
+        summary["duration"] = float(t[-1] - t[0])
+        summary["rate"] = (len(records) - 1) / summary["duration"] if summary["duration"] > 0 else 0.0
+    error = records["position"] - records["target"]
+    error = error[~np.isnan(error)]
+    if len(error):
+        summary["rms_error"] = float(np.sqrt(np.mean(error ** 2)))
+        summary["max_error"] = float(np.max(np.abs(error)))
+    if estimated is not None:
+        error = estimated - records["target"]
+        error = error[~np.isnan(error)]
+        if len(error):
+            summary["rms_error_estimated"] = float(np.sqrt(np.mean(error ** 2)))
+    return summary
+
+
+def render_report(log_dir: str, output_dir: str=None, ids=None, title: str=None, latency: float=None):
+    """
+    Renders the report of a telemetry log: one PNG per motor (target, actual
+    and estimated positions, tracking errors) and an index.html page with a
+    summary table. The estimated positions are extrapolated to the record times
+    by a StateEstimator assuming statuses latency (s) old, so that their error
+    to the target is not biased by the age of the statuses. By default, the age
+    measured during the recording (status_age of the log) is used. Logs without
+    it are not compensated, which the page states.
+    Uses the non-interactive Agg backend, so that no display is needed.
+    Returns the path of the HTML page.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    log = TelemetryLog(log_dir)
+    output_dir = output_dir if output_dir is not None else os.path.join(log_dir, REPORT_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    ids = ids if ids is not None else log.motor_ids()
+    title = title if title is not None else os.path.basename(os.path.normpath(log_dir))
+    if latency is None:
+        latency = log.meta.get("status_age")
+    if latency is None:
+        compensation = "Estimated positions not compensated for latency (no status age measured with the log)."
+        latency = 0.0
+    else:
+        compensation = f"Estimated positions compensated for statuses {latency * 1e3:.3f} ms old."
+
+    rows = []
+    for id in ids:
+        records = log.motor(id)
+        t = log.elapsed(records)
+        estimated, _ = estimate_log(records, latency=latency)
+        summary = motor_summary(log, records, estimated)
+
+        fig, (ax_position, ax_error) = plt.subplots(2, 1, sharex=True, figsize=(10, 6))
+        ax_position.set_title(f"Motor ID {id} Position Tracking")
+        ax_position.plot(t, records["target"], label="Target Position", linestyle='--')
+        ax_position.plot(t, records["position"], label="Actual Position")
+        ax_position.plot(t, estimated, label="Estimated Position", linestyle=':')
+        ax_position.set_ylabel("Position (degrees)")
+        ax_position.legend()
+        ax_position.grid()
+        ax_error.plot(t, records["position"] - records["target"], color="tab:red", label="Actual")
+        ax_error.plot(t, estimated - records["target"], color="tab:green", label="Estimated")
+        ax_error.legend()
+        ax_error.set_xlabel("Time (s)")
+        ax_error.set_ylabel("Error (degrees)")
+        ax_error.grid()
+        image = f"motor_{id}.png"
+        fig.savefig(os.path.join(output_dir, image), dpi=100)
+        plt.close(fig)
+        rows.append((id, summary, image))
+
+    def cell(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    table = "\n".join(
+        f"<tr><td>{id}</td><td>{summary['records']}</td><td>{summary['duration']:.2f}</td>"
+        f"<td>{summary['rate']:.1f}</td><td>{cell(summary['rms_error'], '.3f')}</td>"
+        f"<td>{cell(summary['max_error'], '.3f')}</td><td>{cell(summary['rms_error_estimated'], '.3f')}</td>"
+        f"<td>{cell(summary['max_temp'], 'd')}</td></tr>"
+        for id, summary, _ in rows
+    )
+    images = "\n".join(f'<h2>Motor ID {id}</h2>\n<img src="{image}">' for id, _, image in rows)
+    path = os.path.join(output_dir, "index.html")
+    with open(path, "w") as f:
+        f.write(f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{html.escape(title)}</title></head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>{compensation}</p>
+<table border="1" cellpadding="4">
+<tr><th>Motor ID</th><th>Records</th><th>Duration (s)</th><th>Reply rate (Hz)</th><th>RMS error (deg)</th><th>Max error (deg)</th><th>RMS error, estimated (deg)</th><th>Max temp (°C)</th></tr>
+{table}
+</table>
+{images}
+</body>
+</html>
+""")
+    return path
+
+
+def start_report(log_dir: str, output_dir: str=None, ids=None, latency: float=None):
+    """
+    Renders the report of a telemetry log in a separate Python process, so that
+    matplotlib is never imported nor run in the calling (control) process.
+    A fresh interpreter is started rather than a multiprocessing child, which
+    would inherit the CAN threads (fork) or re-run the calling script (spawn).
+    Returns the subprocess.Popen of the worker without waiting for it.
+    """
+    command = [sys.executable, os.path.abspath(__file__), log_dir]
+    if output_dir is not None:
+        command += ["--output", output_dir]
+    if ids is not None:
+        command += ["--ids"] + [str(id) for id in ids]
+    if latency is not None:
+        command += ["--latency", str(latency)]
+    return subprocess.Popen(command)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Renders the PNG/HTML report of a telemetry log.")
+    parser.add_argument("directory", help="Log directory.")
+    parser.add_argument("--output", help=f"Output directory (<directory>/{REPORT_DIR} by default).")
+    parser.add_argument("--ids", type=int, nargs="+", help="Motor IDs to report (all by default).")
+    parser.add_argument("--latency", type=float,
+                        help="Age of the statuses in seconds (measured during the recording by default).")
+    args = parser.parse_args()
+
+    print(f"Report written to {render_report(args.directory, args.output, args.ids, latency=args.latency)}")
@@ -0,0 +1,213 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import can
+import asyncio
+from collections import deque
+from rmd_codec import (
+    REPLY_BASE, STATUS_OPCODES,
+    CMD_PING, CMD_FILTER, CMD_READ_PID, CMD_WRITE_PID_RAM, CMD_WRITE_PID_ROM,
+    CMD_READ_ACCELERATION, CMD_WRITE_ACCELERATION, CMD_SET_ZERO,
+    CMD_STOP, CMD_BRAKE, CMD_READ_STATUS, CMD_POSITION,
+    ACCELERATION_NAMES, PingReply, decode_pid, decode_acceleration, reply_key,
+)
+from rmd_motor import RMDMotor, MotorStatus
+
+DEFAULT_TIMEOUT = 0.1 # s
+
+
+class AsyncRMDMotor:
+    """
+    Awaitable request/response interface of one RMD motor.
+    Each method sends its command and returns the decoded reply, or raises
+    TimeoutError if the motor did not answer in time.
+    """
+    def __init__(self, client, motor: RMDMotor):
+        self.client = client
+        self.motor = motor
+        self.motor_id = motor.motor_id
+
+    def _request(self, key, send, timeout):
+        return self.client.request(self.motor_id, key, send, timeout)
+
+    # --- UTILITY COMMANDS ---
+
+    async def ping(self, timeout: float=None):
+        """Pings the motor (Command 0x01). Returns a PingReply."""
+        await self._request(CMD_PING, self.motor.ping, timeout)
+        return PingReply(self.motor_id)
+
+    async def read_status(self, timeout: float=None):
+        """Reads the motor status (Command 0x9C). Returns a MotorStatus."""
+        data = await self._request(CMD_READ_STATUS, self.motor.read_status, timeout)
+        status = MotorStatus()
+        status.update(data)
+        return status
+
+    async def read_pid(self, timeout: float=None):
+        """Reads the PID gains (Command 0x30). Returns PIDGains."""
+        data = await self._request(CMD_READ_PID, self.motor.read_pid, timeout)
+        return decode_pid(self.motor_id, data)
+
+    async def read_acceleration(self, index: int, timeout: float=None):
+        """Reads one acceleration parameter (Command 0x42). Returns an AccelerationSetting."""
+        data = await self._request((CMD_READ_ACCELERATION, index),
+                                   lambda: self.motor.read_acceleration_index(index), timeout)
+        return decode_acceleration(self.motor_id, data)
+
+    async def read_accelerations(self, timeout: float=None):
+        """Reads all the acceleration parameters concurrently. Returns a tuple of AccelerationSetting."""
+        return tuple(await asyncio.gather(*(
+            self.read_acceleration(index, timeout) for index in range(len(ACCELERATION_NAMES))
+        )))
+
+    # --- CONFIGURATION COMMANDS ---
+
+    async def set_zero(self, timeout: float=None):
+        """Sets the current multi-turn position as the encoder zero position in the ROM (Command 0x64)."""
+        await self._request(CMD_SET_ZERO, self.motor.set_zero, timeout)
+
+    async def filter_mode(self, enable: bool, timeout: float=None):
+        """Enables or disables motor broadcast mode (Command 0x20)."""
+        await self._request(CMD_FILTER, lambda: self.motor.filter_mode(enable), timeout)
+
+    async def write_acceleration(self, index: int, value: int, timeout: float=None):
+        """Writes one acceleration parameter to RAM and ROM (Command 0x43). Returns the echoed AccelerationSetting."""
+        data = await self._request((CMD_WRITE_ACCELERATION, index),
+                                   lambda: self.motor.write_acceleration_index(index, value), timeout)
+        return decode_acceleration(self.motor_id, data)
+
+    async def write_pid(self, cur_kp: int=0, cur_ki: int=0, vel_kp: int=0, vel_ki: int=0, pos_kp: int=0, pos_ki: int=0,
+                        to_rom: bool=True, timeout: float=None):
+        """Writes the PID gains to ROM (Command 0x32) or RAM (Command 0x31). Returns the echoed PIDGains."""
+        data = await self._request(CMD_WRITE_PID_ROM if to_rom else CMD_WRITE_PID_RAM,
+                                   lambda: self.motor.write_pid(cur_kp, cur_ki, vel_kp, vel_ki, pos_kp, pos_ki, to_rom),
+                                   timeout)
+        return decode_pid(self.motor_id, data)
+
+    # --- CONTROL COMMANDS ---
+
+    async def stop_motor(self, timeout: float=None):
+        """Turns off the motor and clears any running state (Command 0x80)."""
+        await self._request(CMD_STOP, self.motor.stop_motor, timeout)
+
+    async def brake_motor(self, timeout: float=None):
+        """Stops the motor and holds position (Command 0x81)."""
+        await self._request(CMD_BRAKE, self.motor.brake_motor, timeout)
+
+    async def set_position(self, angle_deg: float, max_speed_dps: int=3600, timeout: float=None):
+        """Multi-turn absolute position control (Command 0xA4). Returns the replied MotorStatus."""
+        data = await self._request(CMD_POSITION, lambda: self.motor.set_position(angle_deg, max_speed_dps), timeout)
+        status = MotorStatus()
+        status.update(data)
+        return status
+
+
+class AsyncRMDClient:
+    """
+    Asyncio client of the RMD motors of a CAN bus.
+    Replies are received through a can.AsyncBufferedReader and matched to the
+    pending requests by motor ID and opcode (and parameter index for the
+    acceleration commands), so that requests to many motors can be awaited
+    concurrently instead of sleeping between them. Requests with the same key
+    are matched in order. Status replies, including unrequested active replies,
+    also update the motor status and the MotorStateTable given as state.
+    Use as an async context manager to start and stop the receive task.
+    """
+    def __init__(self, bus, ids, state=None, timeout: float=DEFAULT_TIMEOUT, channel=None):
+        self.bus = bus
+        self.ids = list(ids)
+        self.state = state
+        self.timeout = timeout
+        self.motors = {id: AsyncRMDMotor(self, RMDMotor(bus, id, channel)) for id in self.ids}
+        self.pending = {}   # (motor ID, reply key) -> deque of futures
+        self.unmatched = 0  # Replies without pending request
+        self.timeouts = 0   # Requests without reply
+        self.reader = None
+        self.notifier = None
+        self.task = None
+
+    async def __aenter__(self):
+        self.reader = can.AsyncBufferedReader()
+        self.notifier = can.Notifier(self.bus, [self.reader], loop=asyncio.get_running_loop())
+        self.task = asyncio.create_task(self._receive())
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.notifier.stop()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        for futures in self.pending.values():
+            for future in futures:
+                future.cancel()
+        self.pending.clear()
+
+    def __getitem__(self, id):
+        return self.motors[id]
+
+    async def _receive(self):
+        async for msg in self.reader:
+            self.on_message_received(msg)
+
+    def on_message_received(self, msg):
+        """Resolves the pending request matching a reply frame."""
+        if msg.is_extended_id or msg.is_error_frame or msg.is_remote_frame or msg.dlc < 8:
+            return
+        motor_id = msg.arbitration_id - REPLY_BASE
+        motor = self.motors.get(motor_id)
+        if motor is None:
+            return
+
+        data = bytes(msg.data)
+        if data[0] in STATUS_OPCODES:
+            motor.motor.update_status(data)
+            if self.state is not None:
+                self.state.write(motor_id, motor.motor.status)
+
+        futures = self.pending.get((motor_id, reply_key(data)))
+        while futures:
+            future = futures.popleft()
+            if not future.done():
+                future.set_result(data)
+                return
+        self.unmatched += 1
+
+    async def request(self, motor_id: int, key, send, timeout: float=None):
+        """
+        Registers a pending request for the reply key of motor_id, calls send()
+        to transmit the command, and returns the raw reply data.
+        Raises TimeoutError if no reply was received within timeout (s).
+        """
+        future = asyncio.get_running_loop().create_future()
+        futures = self.pending.setdefault((motor_id, key), deque())
+        futures.append(future)
+        send()
+        try:
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            cmd = key[0] if isinstance(key, tuple) else key
+            raise TimeoutError(f"Motor ID {motor_id} did not reply to command 0x{cmd:02X}") from None
+        finally:
+            if future in futures:
+                futures.remove(future)
+
+    async def map(self, method: str, *args, ids=None, **kwargs):
+        """
+        Calls an AsyncRMDMotor method on several motors (all by default) concurrently.
+        Returns a dict mapping motor IDs to their result, or to the raised exception.
+        """
+        ids = self.ids if ids is None else list(ids)
+        results = await asyncio.gather(
+            *(getattr(self.motors[id], method)(*args, **kwargs) for id in ids),
+            return_exceptions=True
+        )
+        return dict(zip(ids, results))
@@ -0,0 +1,175 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from typing import NamedTuple
+import struct
+
+# CAN arbitration IDs
+COMMAND_BASE = 0x140    # Single motor command: 0x140 + ID
+REPLY_BASE = 0x240      # Single motor reply: 0x240 + ID
+BROADCAST_ID = 0x280    # Multi-motor command
+MAX_ARBITRATION_ID = 0x7FF  # Standard 11-bit identifiers
+FRAME_BITS = 135        # Standard 8-byte data frame with worst case bit stuffing
+
+# Command opcodes
+CMD_PING = 0x01
+CMD_FILTER = 0x20
+CMD_READ_PID = 0x30
+CMD_WRITE_PID_RAM = 0x31
+CMD_WRITE_PID_ROM = 0x32
+CMD_READ_ACCELERATION = 0x42
+CMD_WRITE_ACCELERATION = 0x43
+CMD_SET_ZERO = 0x64
+CMD_RESTART = 0x76
+CMD_SET_ID = 0x79
+CMD_STOP = 0x80
+CMD_BRAKE = 0x81
+CMD_READ_STATUS = 0x9C
+CMD_POSITION = 0xA4
+CMD_ACTIVE_REPLY = 0xB6
+
+# Opcodes whose reply carries the motor status (temp, current, speed, position)
+STATUS_OPCODES = (CMD_READ_STATUS, CMD_POSITION)
+
+# Precompiled frame layouts (8 bytes, little endian)
+OPCODE = struct.Struct("<B7x")              # cmd, padding
+OPCODE_INDEX = struct.Struct("<BB6x")       # cmd, index, padding
+PID = struct.Struct("<B7B")                 # cmd, 0x00, cur_kp, cur_ki, vel_kp, vel_ki, pos_kp, pos_ki
+ACCELERATION = struct.Struct("<BB2xI")      # cmd, index, padding, value (u32)
+FILTER = struct.Struct("<BB2xB3x")          # cmd, 0x02, padding, flag, padding
+SET_ID = struct.Struct("<B6xB")             # cmd, padding, new id
+ACTIVE_REPLY = struct.Struct("<BBBH3x")     # cmd, replied cmd, flag, interval (u16, 10 ms), padding
+POSITION = struct.Struct("<BxHi")           # cmd, 0x00, max speed (u16, dps), angle (i32, 0.01 deg)
+
+
+def pack_opcode(buf, cmd: int):
+    """Writes a frame holding only an opcode into buf."""
+    OPCODE.pack_into(buf, 0, cmd)
+
+
+def pack_opcode_index(buf, cmd: int, index: int):
+    """Writes a frame holding an opcode and a parameter index into buf."""
+    OPCODE_INDEX.pack_into(buf, 0, cmd, index)
+
+
+def pack_pid(buf, cur_kp: int, cur_ki: int, vel_kp: int, vel_ki: int, pos_kp: int, pos_ki: int, to_rom: bool=True):
+    """Writes a PID write frame (0x31 RAM / 0x32 ROM) into buf."""
+    cmd = CMD_WRITE_PID_ROM if to_rom else CMD_WRITE_PID_RAM
+    PID.pack_into(buf, 0, cmd, 0x00, int(cur_kp), int(cur_ki), int(vel_kp), int(vel_ki), int(pos_kp), int(pos_ki))
+
+
+def pack_acceleration(buf, index: int, value: int):
+    """Writes an acceleration write frame (0x43) into buf."""
+    ACCELERATION.pack_into(buf, 0, CMD_WRITE_ACCELERATION, index, value)
+
+
+def pack_filter(buf, enable: bool):
+    """Writes a CAN filter configuration frame (0x20) into buf."""
+    FILTER.pack_into(buf, 0, CMD_FILTER, 0x02, 0x01 if enable else 0x00)
+
+
+def pack_set_id(buf, new_id: int):
+    """Writes a motor ID setting frame (0x79) into buf."""
+    SET_ID.pack_into(buf, 0, CMD_SET_ID, new_id)
+
+
+def pack_active_reply(buf, cmd: int, enable: bool, interval_10ms: int=0):
+    """Writes an active reply configuration frame (0xB6) into buf."""
+    ACTIVE_REPLY.pack_into(buf, 0, CMD_ACTIVE_REPLY, cmd, 0x01 if enable else 0x00, interval_10ms)
+
+
+def pack_position(buf, angle_deg: float, max_speed_dps: int=3600):
+    """Writes a multi-turn absolute position frame (0xA4) into buf.
+    Angle is truncated to the protocol resolution of 0.01 deg/LSB.
+    """
+    POSITION.pack_into(buf, 0, CMD_POSITION, int(max_speed_dps), int(angle_deg * 100))
+
+
+# Precompiled reply layouts
+STATUS_REPLY = struct.Struct("<xBhhh")       # temp (°C), current, speed (dps), position (deg)
+PID_REPLY = struct.Struct("<2x6B")           # cur_kp, cur_ki, vel_kp, vel_ki, pos_kp, pos_ki
+ACCELERATION_REPLY = struct.Struct("<xB2xI")  # index, value (u32)
+
+ACCELERATION_NAMES = (
+    "position planning acceleration",
+    "position planning deceleration",
+    "velocity planning acceleration",
+    "velocity planning deceleration",
+)
+
+
+class PIDGains(NamedTuple):
+    """PID gains of a motor (Commands 0x30/0x31/0x32)."""
+    motor_id: int
+    cur_kp: int
+    cur_ki: int
+    vel_kp: int
+    vel_ki: int
+    pos_kp: int
+    pos_ki: int
+
+
+def format_pid(gains: PIDGains):
+    """Returns the PID gains of a motor as a multi-line text, for display."""
+    return "\n".join([
+        f"Motor ID {gains.motor_id} PID parameters:",
+        f"  Current Kp: {gains.cur_kp}",
+        f"  Current Ki: {gains.cur_ki}",
+        f"  Velocity Kp: {gains.vel_kp}",
+        f"  Velocity Ki: {gains.vel_ki}",
+        f"  Position Kp: {gains.pos_kp}",
+        f"  Position Ki: {gains.pos_ki}",
+    ])
+
+
+class AccelerationSetting(NamedTuple):
+    """One acceleration parameter of a motor (Commands 0x42/0x43), index into ACCELERATION_NAMES."""
+    motor_id: int
+    index: int
+    value: int
+
+    @property
+    def name(self):
+        return ACCELERATION_NAMES[self.index] if self.index < len(ACCELERATION_NAMES) else f"parameter {self.index}"
+
+
+class PingReply(NamedTuple):
+    """Ping reply of a motor (Command 0x01)."""
+    motor_id: int
+
+
+def decode_pid(motor_id: int, data):
+    """Decodes a PID reply (0x30/0x31/0x32)."""
+    return PIDGains(motor_id, *PID_REPLY.unpack_from(data))
+
+
+def decode_acceleration(motor_id: int, data):
+    """Decodes an acceleration reply (0x42/0x43)."""
+    return AccelerationSetting(motor_id, *ACCELERATION_REPLY.unpack_from(data))
+
+
+def reply_key(data):
+    """
+    Returns the key matching a reply frame to its request: the opcode, or
+    (opcode, index) for the indexed acceleration commands.
+    """
+    cmd = data[0]
+    if cmd == CMD_READ_ACCELERATION or cmd == CMD_WRITE_ACCELERATION:
+        return (cmd, data[1])
+    return cmd
+
+
+def reply_table(handlers: dict):
+    """
+    Builds a 256-entry dispatch table indexed by reply opcode.
+    Opcodes without a handler map to None.
+    """
+    table = [None] * 256
+    for cmd, handler in handlers.items():
+        table[cmd] = handler
+    return tuple(table)
@@ -8,224 +8,405 @@
 
 import can
 import time
+from collections import deque
+from rmd_codec import (
+    COMMAND_BASE, REPLY_BASE, BROADCAST_ID, MAX_ARBITRATION_ID, STATUS_OPCODES,
+    CMD_PING, CMD_FILTER, CMD_READ_PID, CMD_WRITE_PID_RAM, CMD_WRITE_PID_ROM,
+    CMD_READ_ACCELERATION, CMD_WRITE_ACCELERATION, CMD_SET_ZERO, CMD_RESTART, CMD_SET_ID,
+    CMD_STOP, CMD_BRAKE, CMD_READ_STATUS, CMD_POSITION, CMD_ACTIVE_REPLY,
+    pack_opcode, pack_opcode_index, pack_pid, pack_acceleration, pack_filter, pack_set_id,
+    pack_active_reply, pack_position,
+    STATUS_REPLY, PingReply, decode_pid, decode_acceleration, reply_table,
+)
 
 BITRATE = 1000000 # 1 Mbps
+REPLY_QUEUE_SIZE = 64 # Typed replies kept per motor until read
+
+
+class MotorStatus:
+    """
+    Last known state of a motor, as reported by 0x9C/0xA4 replies.
+    """
+    __slots__ = ("temp", "current", "speed", "position", "last_update")
+
+    def __init__(self):
+        self.temp = 0          # °C
+        self.current = 0.0     # A
+        self.speed = 0         # deg/s
+        self.position = 0      # deg
+        self.last_update = 0   # s
+
+    def __repr__(self):
+        return (f"MotorStatus(temp={self.temp}, current={self.current}, speed={self.speed}, "
+                f"position={self.position}, last_update={self.last_update})")
+
+    def update(self, data):
+        """Decodes a 0x9C/0xA4 reply frame into this status."""
+        self.temp, current, self.speed, self.position = STATUS_REPLY.unpack_from(data)
+        self.current = current * 100 # Unit to verify
+        self.last_update = time.perf_counter()
 
 
 class RMDMotor:
     """
     Python interface for MyActuator RMD-X/L series motors over CAN bus.
     """
-    def __init__(self, bus, id: int=1):
+    def __init__(self, bus, id: int=1, channel=None):
         self.bus = bus
         self.motor_id = id
-        self.status = {
-            "temp": 0,       # °C
-            "current": 0.0,  # A
-            "speed": 0,      # deg/s
-            "position": 0,   # deg
-            "last_update": 0 # s
-        }
+        self.channel = channel
+        self.reply_id = id + REPLY_BASE
+        self._frames = {}
+        self.status = MotorStatus()
+        self.replies = deque(maxlen=REPLY_QUEUE_SIZE)
+        self.monitor = None
+        self.monitor_ids = (id,)
+        self.scheduler = None
+
+    def _frame(self, kind):
+        """
+        Returns the preallocated CAN message used for a given command kind.
+        Messages are created on first use and then reused for every call.
+        """
+        msg = self._frames.get(kind)
+        if msg is None:
+            msg = can.Message(
+                arbitration_id=self.motor_id + COMMAND_BASE,
+                data=bytearray(8),
+                is_extended_id=False,
+                channel=self.channel
+            )
+            self._frames[kind] = msg
+        return msg
+
+    def attach_monitor(self, monitor, ids=None):
+        """
+        Tags every frame sent by this motor in a LatencyMonitor, as a request
+        to the motors of ids (this motor by default, the replying motors for a
+        broadcast instance).
+        """
+        self.monitor = monitor
+        if ids is not None:
+            self.monitor_ids = tuple(ids)
 
-    def _send(self, data):
+    def attach_scheduler(self, scheduler):
         """
-        Sends a 8-byte CAN frame without waiting for a response.
+        Sends the frames of this motor through a TransmitScheduler instead of
+        writing them directly to the bus. The scheduler then tags the frames in
+        the latency monitor when it transmits them (see its attach_monitor).
+        """
+        self.scheduler = scheduler
+
+    def _send_frame(self, msg):
+        """
+        Sends a preallocated CAN message without waiting for a response.
+        With a scheduler, the message is queued and sent from its thread.
         """
-        msg = can.Message(
-            arbitration_id=self.motor_id + 0x140,
-            data=data,
-            is_extended_id=False
-        )
+        if self.scheduler is not None:
+            self.scheduler.submit(msg)
+            return
+        if self.monitor is not None:
+            self.monitor.on_send(self.monitor_ids, msg.data[0])
         try:
             self.bus.send(msg)
         except can.CanError as e:
             print(f"CAN Error: {e}")
+            if self.monitor is not None:
+                self.monitor.on_failed(self.monitor_ids, msg.data[0])
+
+    def _send(self, data):
+        """
+        Sends a 8-byte CAN frame without waiting for a response.
+        """
+        msg = self._frame(None)
+        msg.data[:] = bytes(data)
+        self._send_frame(msg)
+
+    def _send_opcode(self, cmd: int):
+        """
+        Sends a frame holding only an opcode.
+        """
+        msg = self._frame(cmd)
+        pack_opcode(msg.data, cmd)
+        self._send_frame(msg)
+
+    def _send_opcode_index(self, cmd: int, index: int):
+        """
+        Sends a frame holding an opcode and a parameter index.
+        """
+        msg = self._frame((cmd, index))
+        pack_opcode_index(msg.data, cmd, index)
+        self._send_frame(msg)
 
     def update_status(self, data):
         """
         Updates the motor status based on received CAN data.
         """
+        handler = self._reply_handlers[data[0]]
+        if handler is not None:
+            handler(self, data)
 
-        # Status update
-        if data[0] in [0x9C, 0xA4]:
-            self.status.update({
-                "temp": data[1],
-                "current": int.from_bytes(data[2:4], byteorder='little', signed=True) * 100, # Unit to verify
-                "speed": int.from_bytes(data[4:6], byteorder='little', signed=True), 
-                "position": int.from_bytes(data[6:8], byteorder='little', signed=True), 
-                "last_update": time.perf_counter()
-            })
-        
-        # PID print
-        elif data[0] in [0x30, 0x31, 0x32]:
-            print(f"Motor ID {self.motor_id} PID parameters:")
-            print(f"  Current Kp: {data[2]}")
-            print(f"  Current Ki: {data[3]}")
-            print(f"  Velocity Kp: {data[4]}")
-            print(f"  Velocity Ki: {data[5]}")
-            print(f"  Position Kp: {data[6]}")
-            print(f"  Position Ki: {data[7]}", flush=True)
-
-        # Ping print
-        elif data[0] == 0x01:
-            print(f"Motor ID {self.motor_id} responded to ping.", flush=True)
-
-        # Acceleration print
-        elif data[0] == 0x42:
-            if data[1] == 0x00:
-                print(f"Motor ID {self.motor_id} position planning acceleration: {int.from_bytes(data[4:8], byteorder='little', signed=False)}", flush=True)
-            elif data[1] == 0x01:
-                print(f"Motor ID {self.motor_id} position planning deceleration: {int.from_bytes(data[4:8], byteorder='little', signed=False)}", flush=True)
-            elif data[1] == 0x02:
-                print(f"Motor ID {self.motor_id} velocity planning acceleration: {int.from_bytes(data[4:8], byteorder='little', signed=False)}", flush=True)
-            elif data[1] == 0x03:
-                print(f"Motor ID {self.motor_id} velocity planning deceleration: {int.from_bytes(data[4:8], byteorder='little', signed=False)}", flush=True)
+    def _on_status(self, data):
+        self.status.update(data)
+
+    # PID, ping and acceleration replies are published as typed records on the
+    # replies queue and never printed, so that the listener thread does not wait
+    # on terminal I/O. Printing is left to the command line scripts.
+
+    def _on_pid(self, data):
+        self.replies.append(decode_pid(self.motor_id, data))
+
+    def _on_ping(self, data):
+        self.replies.append(PingReply(self.motor_id))
+
+    def _on_acceleration(self, data):
+        self.replies.append(decode_acceleration(self.motor_id, data))
+
+    def pop_replies(self):
+        """
+        Returns and removes the typed replies (PIDGains, AccelerationSetting,
+        PingReply) received since the last call, oldest first. Only the last
+        REPLY_QUEUE_SIZE replies are kept.
+        """
+        replies = []
+        while self.replies:
+            replies.append(self.replies.popleft())
+        return replies
+
+    _reply_handlers = reply_table({
+        CMD_READ_STATUS: _on_status,
+        CMD_POSITION: _on_status,
+        CMD_READ_PID: _on_pid,
+        CMD_WRITE_PID_RAM: _on_pid,
+        CMD_WRITE_PID_ROM: _on_pid,
+        CMD_PING: _on_ping,
+        CMD_READ_ACCELERATION: _on_acceleration,
+    })
             
     # --- UTILITY COMMANDS ---
     
     def ping(self):
         """Sends a ping command to check if the motor is responsive."""
-        self._send([0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+        self._send_opcode(CMD_PING)
 
     def read_status(self):
         """Reads motor temperature, voltage, and error flags (Command 0x9C)."""
-        self._send([0x9C, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+        self._send_opcode(CMD_READ_STATUS)
     
     def read_acceleration(self, pos_acc: bool=True, pos_dec: bool=True, vel_acc: bool=True, vel_dec: bool=True):
         """Reads the acceleration setting from the motor (Command 0x42)."""
-        if pos_acc:
-            self._send([0x42, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-            time.sleep(0.1)
-        if pos_dec:
-            self._send([0x42, 0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-            time.sleep(0.1)
-        if vel_acc:
-            self._send([0x42, 0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-            time.sleep(0.1)
-        if vel_dec:
-            self._send([0x42, 0x03, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-            time.sleep(0.1)
+        for index, selected in enumerate((pos_acc, pos_dec, vel_acc, vel_dec)):
+            if selected:
+                self.read_acceleration_index(index)
+                time.sleep(0.1)
+
+    def read_acceleration_index(self, index: int):
+        """Reads one acceleration parameter (index into ACCELERATION_NAMES) from the motor (Command 0x42)."""
+        self._send_opcode_index(CMD_READ_ACCELERATION, index)
         
     def read_pid(self):
         """Reads the current proportional gain Kp from the motor (Command 0x30)."""
-        self._send([0x30, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+        self._send_opcode(CMD_READ_PID)
 
     # --- CONFIGURATION COMMANDS ---
 
     def set_zero(self):
         """Sets the current multi-turn position as the encoder zero position in the ROM (Command 0x64)."""
-        self._send([0x64, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+        self._send_opcode(CMD_SET_ZERO)
 
     def restart(self):
         """Restarts the motor system (Command 0x76)."""
-        self._send([0x76, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+        self._send_opcode(CMD_RESTART)
 
     def active_reply(self, cmd: int, enable: bool, interval_10ms: int=0):
         """Enables or disables active reply mode (Command 0xB6)."""
-        flag = 0x01 if enable else 0x00
-        interval = interval_10ms.to_bytes(4, byteorder='little', signed=False)
-        self._send([0xB6, cmd, flag, interval[0], interval[1], 0x00, 0x00, 0x00])
+        msg = self._frame(CMD_ACTIVE_REPLY)
+        pack_active_reply(msg.data, cmd, enable, interval_10ms)
+        self._send_frame(msg)
 
     def filter_mode(self, enable: bool):
         """Enables or disables motor broadcast mode."""
-        flag = 0x01 if enable else 0x00
-        self._send([0x20, 0x02, 0x00, 0x00, flag, 0x00, 0x00, 0x00])
+        msg = self._frame(CMD_FILTER)
+        pack_filter(msg.data, enable)
+        self._send_frame(msg)
 
     def set_id(self, new_id: int):
         """Sets a new motor ID (Command 0x79)."""
-        self._send([0x79, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, new_id])
+        msg = self._frame(CMD_SET_ID)
+        pack_set_id(msg.data, new_id)
+        self._send_frame(msg)
     
     def write_acceleration(self, value: int, pos_acc: bool=True, pos_dec: bool=True, vel_acc: bool=True, vel_dec: bool=True):
         """Writes the acceleration setting to the motor RAM and ROM (Command 0x43)."""
-        value_bytes = value.to_bytes(4, byteorder='little', signed=False)
-        if pos_acc:
-            self._send([0x43, 0x00, 0x00, 0x00] + list(value_bytes))
-            time.sleep(0.1)
-        if pos_dec:
-            self._send([0x43, 0x01, 0x00, 0x00] + list(value_bytes))
-            time.sleep(0.1)
-        if vel_acc:
-            self._send([0x43, 0x02, 0x00, 0x00] + list(value_bytes))
-            time.sleep(0.1)
-        if vel_dec:
-            self._send([0x43, 0x03, 0x00, 0x00] + list(value_bytes))
-            time.sleep(0.1)
+        for index, selected in enumerate((pos_acc, pos_dec, vel_acc, vel_dec)):
+            if selected:
+                self.write_acceleration_index(index, value)
+                time.sleep(0.1)
+
+    def write_acceleration_index(self, index: int, value: int):
+        """Writes one acceleration parameter (index into ACCELERATION_NAMES) to the motor RAM and ROM (Command 0x43)."""
+        msg = self._frame((CMD_WRITE_ACCELERATION, index))
+        pack_acceleration(msg.data, index, value)
+        self._send_frame(msg)
             
     def write_pid(self, cur_kp: int=0, cur_ki: int=0, vel_kp: int=0, vel_ki: int=0, pos_kp: int=0, pos_ki: int=0, to_rom: bool=True):
         """Writes position proportional gain Kp to non-volatile ROM (Command 0x32) or volatile RAM (Command 0x31)."""
-        cmd = 0x32 if to_rom else 0x31
-        self._send([cmd, 0x00, cur_kp, cur_ki, vel_kp, vel_ki, pos_kp, pos_ki])
+        msg = self._frame(CMD_WRITE_PID_ROM if to_rom else CMD_WRITE_PID_RAM)
+        pack_pid(msg.data, cur_kp, cur_ki, vel_kp, vel_ki, pos_kp, pos_ki, to_rom)
+        self._send_frame(msg)
         
     # --- CONTROL COMMANDS ---
 
     def stop_motor(self):
         """Turns off the motor and clears any running state (Command 0x80)."""
-        self._send([0x80, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+        self._send_opcode(CMD_STOP)
 
     def brake_motor(self):
         """Stops the motor and holds position (Command 0x81)."""
-        self._send([0x81, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+        self._send_opcode(CMD_BRAKE)
     
     def set_position(self, angle_deg: float, max_speed_dps: int=3600):
         """Multi-turn absolute position control (Command 0xA4).
         Value: angle in degrees. Protocol uses 0.01 deg/LSB.
         """
-        angle_val = int(angle_deg * 100)
-        angle_bytes = angle_val.to_bytes(4, byteorder='little', signed=True)
-        max_speed_bytes = int(max_speed_dps).to_bytes(2, byteorder='little', signed=False)
-        data = [0xA4, 0x00] + list(max_speed_bytes) + list(angle_bytes)
-        self._send(data)
+        self._send_frame(self.encode_position(angle_deg, max_speed_dps))
+
+    def encode_position(self, angle_deg: float, max_speed_dps: int=3600):
+        """Encodes a position command (Command 0xA4) without sending it.
+        Returns the preallocated message, valid until the next position command.
+        """
+        msg = self._frame(CMD_POSITION)
+        pack_position(msg.data, angle_deg, max_speed_dps)
+        return msg
 
     # --- STATUS GETTERS ---
 
     def get_position(self):
         """Returns the last known position in degrees."""
-        return self.status["position"]
+        return self.status.position
     
     def get_velocity(self):
         """Returns the last known velocity in degrees per second."""
-        return self.status["speed"]
+        return self.status.speed
     
     def get_current(self):
         """Returns the last known current in Amperes."""
-        return self.status["current"]
+        return self.status.current
     
     def get_temperature(self):
         """Returns the last known temperature in degrees Celsius."""
-        return self.status["temp"]
+        return self.status.temp
     
     def get_last_update_time(self):
         """Returns the timestamp of the last status update."""
-        return self.status["last_update"]
+        return self.status.last_update
 
 
 class RMDMotorBroadcast(RMDMotor):
     """
     Subclass for broadcasting commands to all motors on the CAN bus.
     """
-    def __init__(self, bus):
-        super().__init__(bus, id=(0x280 - 0x140))  # Broadcast ID is 0x280
+    def __init__(self, bus, channel=None):
+        super().__init__(bus, id=(BROADCAST_ID - COMMAND_BASE), channel=channel)  # Broadcast ID is 0x280
+        self.reply_id = BROADCAST_ID
 
 
 class RMDListener(can.Listener):
     """
     Asynchronous listener that intercepts CAN messages and updates 
     the corresponding RMDMotor instances.
+
+    Frames are routed through a table indexed directly by the 11-bit
+    arbitration ID. Each motor is routed on its reply ID (0x240 + ID, which
+    also carries its active reply frames), broadcast instances on 0x280, and
+    any other ID can be given a custom handler with route().
     """
-    def __init__(self, motors_dict):
+    def __init__(self, motors_dict, state=None, recorder=None, monitor=None):
         """
+        motors_dict maps motor IDs to RMDMotor instances. If a MotorStateTable
+        is given as state, status replies are also written into its rows, and
+        if a TelemetryRecorder is given as recorder, they are appended to its log.
+        Replies are matched to their request in monitor (a LatencyMonitor) if given.
         """
-        self.motors = motors_dict 
+        self.motors = {}
+        self.state = state
+        self.recorder = recorder
+        self.monitor = monitor
+        self.routes = [None] * (MAX_ARBITRATION_ID + 1)
+        self.received = [0] * (MAX_ARBITRATION_ID + 1)  # Frames received per ID
+        self.unknown = [0] * (MAX_ARBITRATION_ID + 1)   # Frames without handler per ID
+        self.dropped = [0] * (MAX_ARBITRATION_ID + 1)   # Malformed (remote/short) frames per ID
+        self.dropped_other = 0                          # Extended and error frames
+        for motor in motors_dict.values():
+            self.add_motor(motor)
+
+    def route(self, arbitration_id: int, handler):
+        """
+        Routes the frames received on arbitration_id to handler(msg).
+        Passing None as handler removes the route.
+        """
+        self.routes[arbitration_id] = handler
+
+    def add_motor(self, motor):
+        """
+        Routes the replies of motor to its update_status method.
+        """
+        self.motors[motor.motor_id] = motor
+        if motor.reply_id <= MAX_ARBITRATION_ID:
+            self.route(motor.reply_id, self._motor_handler(motor))
+
+    def _motor_handler(self, motor):
+        update_status = motor.update_status
+        status = motor.status
+        motor_id = motor.motor_id
+        state = self.state if self.state is not None and motor_id <= self.state.max_id else None
+        recorder = self.recorder if self.recorder is not None and motor_id <= self.recorder.max_id else None
+        monitor = self.monitor
+
+        if state is None and recorder is None and monitor is None:
+            return lambda msg: update_status(msg.data)
+
+        def handler(msg):
+            data = msg.data
+            if monitor is not None:
+                monitor.on_reply(motor_id, data[0], msg.timestamp)
+            update_status(data)
+            if data[0] in STATUS_OPCODES:
+                if state is not None:
+                    state.write(motor_id, status)
+                if recorder is not None:
+                    recorder.record(motor_id, status)
+        return handler
 
     def on_message_received(self, msg):
-        if msg.arbitration_id - 0x240 in self.motors:
-            id = msg.arbitration_id - 0x240
-            self.motors[id].update_status(msg.data)
+        if msg.is_extended_id or msg.is_error_frame:
+            self.dropped_other += 1
+            return
+
+        arbitration_id = msg.arbitration_id
+        self.received[arbitration_id] += 1
+        handler = self.routes[arbitration_id]
+        if handler is None:
+            self.unknown[arbitration_id] += 1
+        elif msg.is_remote_frame or msg.dlc < 8:
+            self.dropped[arbitration_id] += 1
+        else:
+            handler(msg)
+
+    def counters(self):
+        """
+        Returns the non-zero frame counters as {arbitration_id: (received, unknown, dropped)}.
+        """
+        return {
+            arbitration_id: (self.received[arbitration_id], self.unknown[arbitration_id], self.dropped[arbitration_id])
+            for arbitration_id in range(MAX_ARBITRATION_ID + 1)
+            if self.received[arbitration_id]
+        }
 
 
 if __name__ == "__main__":
-    import can.interfaces.canalystii as canalystii
-    import time
+    from can_bus import connect
+    from control_loop import ControlLoop
     import sys
 
     if len(sys.argv) <= 1:
@@ -235,19 +416,12 @@ if __name__ == "__main__":
 
     ids = [int(arg) for arg in sys.argv[1:]]
 
-    with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE, receive_own_messages=False) as bus:
-        motors = {}
-        for id in ids:
-            motors[id] = RMDMotor(bus, id)
-
-        listener = RMDListener(motors)
-        with can.Notifier(bus, [listener]):
-            while True:
-                step_start = time.time()
-
-                for id, motor in motors.items():
-                    motor.read_status()
-                    print(f"Motor ID {id} status: {motor.status}")
-                
-                while time.time() - step_start < 0.1:
-                    time.sleep(1e-4)
\ No newline at end of file
+    with connect(ids) as group:
+        for _ in ControlLoop(0.1).run():
+            snapshot, missing = group.read_all(timeout=0.05)
+            for id, row in zip(ids, snapshot):
+                if id in missing:
+                    print(f"Motor ID {id} status: no reply")
+                else:
+                    print(f"Motor ID {id} status: temp={row['temp']} current={row['current']} "
+                          f"speed={row['speed']} position={row['position']} last_update={row['last_update']}")
\ No newline at end of file
@@ -0,0 +1,237 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import can
+from rmd_codec import (
+    COMMAND_BASE, REPLY_BASE, BROADCAST_ID, FRAME_BITS,
+    CMD_READ_PID, CMD_WRITE_PID_RAM, CMD_WRITE_PID_ROM, CMD_READ_ACCELERATION,
+    CMD_WRITE_ACCELERATION, CMD_STOP, CMD_BRAKE, CMD_READ_STATUS, CMD_POSITION, CMD_ACTIVE_REPLY,
+    POSITION, ACCELERATION, ACTIVE_REPLY, PID, STATUS_REPLY,
+)
+import heapq
+import math
+import random
+import struct
+import threading
+import time
+
+SIM_CHANNEL = "coconuts_sim"
+
+ACCELERATION_REPLY_FRAME = struct.Struct("<BB2xI")
+
+
+class SimulatedMotor:
+    """
+    Emulated RMD-X6 firmware state, with first-order position dynamics
+    limited by the commanded maximum speed.
+    """
+    def __init__(self, motor_id: int, tau: float=0.03, temp: int=30):
+        self.motor_id = motor_id
+        self.tau = tau
+        self.temp = temp
+        self.position = 0.0     # deg
+        self.speed = 0.0        # deg/s
+        self.target = 0.0       # deg
+        self.max_speed = 3600   # deg/s
+        self.enabled = False
+        self.last_time = time.perf_counter()
+        self.pid = [100, 100, 100, 5, 100, 5]
+        self.acceleration = [0, 0, 0, 0]
+        self.active_cmd = None
+        self.active_period = 0.0
+        self.active_next = 0.0
+
+    def advance(self, now: float):
+        """Integrates the dynamics up to now."""
+        dt = now - self.last_time
+        self.last_time = now
+        if dt <= 0 or not self.enabled:
+            self.speed = 0.0
+            return
+        delta = (self.target - self.position) * (1 - math.exp(-dt / self.tau))
+        max_delta = self.max_speed * dt
+        delta = max(-max_delta, min(max_delta, delta))
+        self.position += delta
+        self.speed = delta / dt
+
+    def status_frame(self, cmd: int):
+        """Returns a status reply frame (0x9C/0xA4 layout)."""
+        def clamp16(value):
+            return max(-32768, min(32767, int(round(value))))
+        data = bytearray(8)
+        STATUS_REPLY.pack_into(data, 0, self.temp, 0, clamp16(self.speed), clamp16(self.position))
+        data[0] = cmd
+        return data
+
+    def handle(self, data, now: float):
+        """
+        Applies a command frame and returns the reply frame, or None.
+        """
+        self.advance(now)
+        cmd = data[0]
+
+        if cmd == CMD_POSITION:
+            _, max_speed, angle = POSITION.unpack_from(data)
+            self.target = angle / 100
+            self.max_speed = max_speed if max_speed > 0 else 3600
+            self.enabled = True
+            return self.status_frame(cmd)
+
+        if cmd == CMD_READ_STATUS:
+            return self.status_frame(cmd)
+
+        if cmd == CMD_READ_PID:
+            reply = bytearray(8)
+            PID.pack_into(reply, 0, cmd, 0x00, *self.pid)
+            return reply
+
+        if cmd in (CMD_WRITE_PID_RAM, CMD_WRITE_PID_ROM):
+            self.pid = list(PID.unpack_from(data)[2:])
+            return bytearray(data)
+
+        if cmd == CMD_READ_ACCELERATION:
+            index = data[1] & 0x03
+            reply = bytearray(8)
+            ACCELERATION_REPLY_FRAME.pack_into(reply, 0, cmd, index, self.acceleration[index])
+            return reply
+
+        if cmd == CMD_WRITE_ACCELERATION:
+            _, index, value = ACCELERATION.unpack_from(data)
+            self.acceleration[index & 0x03] = value
+            return bytearray(data)
+
+        if cmd == CMD_ACTIVE_REPLY:
+            _, active_cmd, enable, interval_10ms = ACTIVE_REPLY.unpack_from(data)
+            if enable and interval_10ms > 0:
+                self.active_cmd = active_cmd
+                self.active_period = interval_10ms * 0.01
+                self.active_next = now + self.active_period
+            else:
+                self.active_cmd = None
+            return bytearray(data)
+
+        if cmd in (CMD_STOP, CMD_BRAKE):
+            self.enabled = cmd == CMD_BRAKE
+            self.target = self.position
+            return bytearray(data)
+
+        # Ping and configuration commands are acknowledged with an echo
+        return bytearray(data)
+
+
+class SimulatedBus:
+    """
+    Fleet of emulated RMD motors answering on a python-can virtual bus.
+    Replies are delayed by a configurable latency, serialized at the bus bitrate,
+    and can be randomly lost. Use as a context manager to run the firmware thread,
+    and open the controller side with sim_bus().
+    """
+    def __init__(self, ids, channel: str=SIM_CHANNEL, latency: float=0.0005, jitter: float=0.0,
+                 loss: float=0.0, bitrate: int=1000000, tau: float=0.03, seed: int=None):
+        self.motors = {id: SimulatedMotor(id, tau) for id in ids}
+        self.channel = channel
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.frame_time = FRAME_BITS / bitrate
+        self.random = random.Random(seed)
+        self.bus = None
+        self.thread = None
+        self.running = False
+        self.pending = []       # Heap of (due time, sequence, arbitration ID, data)
+        self.sequence = 0
+        self.bus_free = 0.0     # Time at which the simulated wire becomes idle
+        self.received = 0
+        self.sent = 0
+        self.lost = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """Opens the firmware side of the virtual bus and starts answering frames."""
+        self.bus = can.Bus(interface="virtual", channel=self.channel, receive_own_messages=False)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="RMD simulator", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the firmware thread and closes its side of the bus."""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.bus is not None:
+            self.bus.shutdown()
+            self.bus = None
+
+    def _schedule(self, motor_id: int, data, now: float):
+        if self.loss > 0 and self.random.random() < self.loss:
+            self.lost += 1
+            return
+        due = now + self.latency
+        if self.jitter > 0:
+            due += self.random.uniform(0, self.jitter)
+        due = max(due, self.bus_free) + self.frame_time
+        self.bus_free = due
+        self.sequence += 1
+        heapq.heappush(self.pending, (due, self.sequence, motor_id + REPLY_BASE, data))
+
+    def _on_frame(self, msg, now: float):
+        if msg.is_extended_id or msg.dlc < 8:
+            return
+        self.received += 1
+        if msg.arbitration_id == BROADCAST_ID:
+            targets = self.motors.values()
+        else:
+            motor = self.motors.get(msg.arbitration_id - COMMAND_BASE)
+            if motor is None:
+                return
+            targets = (motor,)
+        for motor in targets:
+            reply = motor.handle(msg.data, now)
+            if reply is not None:
+                self._schedule(motor.motor_id, reply, now)
+
+    def _next_event(self):
+        next_time = self.pending[0][0] if self.pending else math.inf
+        for motor in self.motors.values():
+            if motor.active_cmd is not None:
+                next_time = min(next_time, motor.active_next)
+        return next_time
+
+    def _run(self):
+        while self.running:
+            now = time.perf_counter()
+            timeout = min(self._next_event() - now, 0.01)
+            msg = self.bus.recv(timeout=max(timeout, 0.0))
+            now = time.perf_counter()
+            if msg is not None:
+                self._on_frame(msg, now)
+
+            # Active replies
+            for motor in self.motors.values():
+                if motor.active_cmd is not None and now >= motor.active_next:
+                    motor.active_next += motor.active_period
+                    motor.advance(now)
+                    self._schedule(motor.motor_id, motor.status_frame(motor.active_cmd), now)
+
+            # Delayed replies
+            while self.pending and self.pending[0][0] <= now:
+                _, _, arbitration_id, data = heapq.heappop(self.pending)
+                self.bus.send(can.Message(arbitration_id=arbitration_id, data=data, is_extended_id=False))
+                self.sent += 1
+
+
+def sim_bus(channel: str=SIM_CHANNEL):
+    """Opens the controller side of a simulated bus."""
+    return can.Bus(interface="virtual", channel=channel, receive_own_messages=False)
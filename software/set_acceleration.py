@@ -6,9 +6,7 @@
 
 #     http://www.apache.org/licenses/LICENSE-2.0
 
-import can
-import can.interfaces.canalystii as canalystii
-from rmd_motor import BITRATE, RMDMotor, RMDListener
+from can_bus import connect
 import time
 import sys
 
@@ -20,13 +18,7 @@ if len(sys.argv) <= 2:
 value = int(sys.argv[1])
 ids = [int(arg) for arg in sys.argv[2:]]
 
-with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE, receive_own_messages=False) as bus:
-    motors = {}
-    for id in ids:
-        motors[id] = RMDMotor(bus, id)
-
-    listener = RMDListener(motors)
-    with can.Notifier(bus, [listener]):
-        for id, motor in motors.items():
-            motor.write_acceleration(value)
-            time.sleep(0.1)
\ No newline at end of file
+with connect(ids) as group:
+    for id, motor in group.motors.items():
+        motor.write_acceleration(value)
+        time.sleep(0.1)
\ No newline at end of file
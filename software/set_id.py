@@ -6,9 +6,9 @@
 
 #     http://www.apache.org/licenses/LICENSE-2.0
 
+from can_bus import open_bus
+from rmd_motor import RMDMotor, RMDListener
 import can
-import can.interfaces.canalystii as canalystii
-from rmd_motor import BITRATE, RMDMotor, RMDListener
 import time
 import sys
 
@@ -19,7 +19,7 @@ if len(sys.argv) != 2:
 
 new_id = int(sys.argv[1])
 
-with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE, receive_own_messages=False) as bus:
+with open_bus() as bus:
     setting_id = 0x300 - 0x140
     broadcast_id = 0x280 - 0x140
     motors = {setting_id: RMDMotor(bus, setting_id), 
@@ -6,15 +6,14 @@
 
 #     http://www.apache.org/licenses/LICENSE-2.0
 
-import can
-import can.interfaces.canalystii as canalystii
-from rmd_motor import BITRATE, RMDMotor, RMDListener
-import time
+from can_bus import connect_async
+from rmd_codec import format_pid
+import asyncio
 import sys
 
 if len(sys.argv) != 4:
-    print("Usage: python set_filter.py [ID] [Kp] [Ki]")
-    print("Example: python set_filter.py 1 100 5")
+    print("Usage: python set_pid.py [ID] [Kp] [Ki]")
+    print("Example: python set_pid.py 1 100 5")
     sys.exit(1)
 
 motor_id = int(sys.argv[1])
@@ -27,11 +26,14 @@ cur_ki = 100
 vel_kp = 100
 vel_ki = 5
 
-with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE, receive_own_messages=False) as bus:
-    motors = {motor_id: RMDMotor(bus, motor_id)}
 
-    listener = RMDListener(motors)
-    with can.Notifier(bus, [listener]):
-        for id, motor in motors.items():
-            motor.write_pid(cur_kp, cur_ki, vel_kp, vel_ki, Kp, Ki, to_rom=True)
-            time.sleep(0.3)
\ No newline at end of file
+async def main():
+    async with connect_async([motor_id]) as client:
+        return await client[motor_id].write_pid(cur_kp, cur_ki, vel_kp, vel_ki, Kp, Ki, to_rom=True)
+
+try:
+    gains = asyncio.run(main())
+except TimeoutError:
+    print(f"Motor ID {motor_id} did not respond to the PID write.")
+    sys.exit(1)
+print(format_pid(gains))
@@ -6,11 +6,11 @@
 
 #     http://www.apache.org/licenses/LICENSE-2.0
 
-import can.interfaces.canalystii as canalystii
-from rmd_motor import RMDMotorBroadcast, BITRATE
+from can_bus import open_bus
+from rmd_motor import RMDMotorBroadcast
 import time
 
-with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE) as bus:
+with open_bus() as bus:
     motors = RMDMotorBroadcast(bus)
     motors.set_zero()
     time.sleep(0.5)
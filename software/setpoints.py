@@ -0,0 +1,158 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from collections import deque
+import numpy as np
+
+METHODS = ("minimum_jerk", "cubic")
+LOOKAHEAD = 8   # Default number of buffered future waypoints
+
+
+def waypoint_derivatives(times, positions):
+    """
+    Estimates the velocities and accelerations at waypoints (one row per time)
+    by finite differences over the neighbouring waypoints (Catmull-Rom tangents).
+    The first and last waypoints get one-sided velocities and zero accelerations.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+    velocities = np.zeros_like(positions)
+    accelerations = np.zeros_like(positions)
+    if len(times) < 2:
+        return velocities, accelerations
+
+    slopes = np.diff(positions, axis=0) / np.diff(times)[:, None]
+    velocities[0] = slopes[0]
+    velocities[-1] = slopes[-1]
+    if len(times) > 2:
+        span = (times[2:] - times[:-2])[:, None]
+        velocities[1:-1] = (positions[2:] - positions[:-2]) / span
+        accelerations[1:-1] = 2 * (slopes[1:] - slopes[:-1]) / span
+    return velocities, accelerations
+
+
+def hermite(s, h, p0, v0, a0, p1, v1, a1, method: str="minimum_jerk"):
+    """
+    Evaluates the segment from (p0, v0, a0) to (p1, v1, a1) of duration h at
+    the normalized times s (0 to 1). minimum_jerk is the quintic matching the
+    positions, velocities and accelerations at both ends; cubic only matches
+    the positions and velocities.
+    """
+    s2 = s * s
+    s3 = s2 * s
+    if method == "cubic":
+        return ((2*s3 - 3*s2 + 1) * p0 + (s3 - 2*s2 + s) * h * v0
+                + (-2*s3 + 3*s2) * p1 + (s3 - s2) * h * v1)
+    s4 = s3 * s
+    s5 = s4 * s
+    return ((1 - 10*s3 + 15*s4 - 6*s5) * p0
+            + (s - 6*s3 + 8*s4 - 3*s5) * h * v0
+            + (0.5*s2 - 1.5*s3 + 1.5*s4 - 0.5*s5) * h * h * a0
+            + (0.5*s3 - s4 + 0.5*s5) * h * h * a1
+            + (-4*s3 + 7*s4 - 3*s5) * h * v1
+            + (10*s3 - 15*s4 + 6*s5) * p1)
+
+
+def upsample(times, positions, dt: float, method: str="minimum_jerk"):
+    """
+    Resamples a whole trajectory (positions, one row per waypoint time) at a
+    time step dt, in one vectorized pass. Returns the new times and positions.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+    velocities, accelerations = waypoint_derivatives(times, positions)
+
+    samples = np.arange(times[0], times[-1] + dt / 2, dt)
+    i = np.clip(np.searchsorted(times, samples, side="right") - 1, 0, len(times) - 2)
+    h = (times[i + 1] - times[i])[:, None]
+    s = np.clip((samples[:, None] - times[i][:, None]) / h, 0.0, 1.0)
+    values = hermite(s, h, positions[i], velocities[i], accelerations[i],
+                     positions[i + 1], velocities[i + 1], accelerations[i + 1], method)
+    return samples, values
+
+
+class SetpointInterpolator:
+    """
+    Streaming setpoint stage: sparse waypoints (e.g. from a kinematics solver
+    running at a low rate) are pushed as they are produced, and dense position
+    commands are sampled at the bus rate with minimum-jerk or cubic
+    interpolation.
+
+    The tangents at the end of the current segment need the waypoint after it,
+    so commands should be sampled at least two waypoint periods behind the
+    newest waypoint (see delay). Otherwise, the last segment falls back to
+    one-sided tangents. At most lookahead future waypoints are buffered;
+    push() refuses waypoints beyond it, so that the producer cannot run away.
+    """
+    def __init__(self, method: str="minimum_jerk", lookahead: int=LOOKAHEAD):
+        if method not in METHODS:
+            raise ValueError(f"Unknown interpolation method '{method}', expected one of {', '.join(METHODS)}")
+        self.method = method
+        self.lookahead = lookahead
+        self.times = deque()
+        self.positions = deque()
+        self.segment = None     # (key, t0, h, p0, v0, a0, p1, v1, a1) of the last sampled segment
+
+    def __len__(self):
+        return len(self.times)
+
+    def push(self, t: float, positions):
+        """
+        Appends a waypoint at time t (s, increasing). Returns False if the
+        lookahead buffer is full and the waypoint was not added.
+        """
+        if self.times and t <= self.times[-1]:
+            raise ValueError(f"Waypoint time {t} is not after the previous one ({self.times[-1]})")
+        if len(self.times) >= self.lookahead + 2:    # Current segment start and its predecessor are kept
+            return False
+        self.times.append(t)
+        self.positions.append(np.asarray(positions, dtype=np.float64))
+        return True
+
+    @property
+    def delay(self):
+        """Minimum delay (s) between the newest waypoint and sampling, to keep both tangents of a segment."""
+        if len(self.times) < 2:
+            return 0.0
+        return 2 * (self.times[-1] - self.times[-2])
+
+    def sample(self, t: float):
+        """
+        Returns the interpolated positions at time t (s, increasing between calls).
+        Holds the first or last waypoint outside of the buffered range, and
+        returns None while no waypoint was pushed.
+        """
+        times, positions = self.times, self.positions
+        if not times:
+            return None
+
+        # Drops the waypoints that are no longer needed (keeping the predecessor of the current segment)
+        while len(times) >= 3 and times[2] <= t:
+            times.popleft()
+            positions.popleft()
+
+        if t <= times[0] or len(times) == 1:
+            return positions[0].copy()
+        if t >= times[-1]:
+            return positions[-1].copy()
+
+        i = 0 if t < times[1] else 1
+        start = max(i - 1, 0)
+        stop = min(i + 3, len(times))
+        key = (times[i], start - i, stop - i)   # The tangents depend on the available neighbours
+        if self.segment is None or self.segment[0] != key:
+            window_times = np.array([times[k] for k in range(start, stop)])
+            window_positions = np.array([positions[k] for k in range(start, stop)])
+            velocities, accelerations = waypoint_derivatives(window_times, window_positions)
+            j = i - start
+            self.segment = (key, window_times[j], window_times[j + 1] - window_times[j],
+                            window_positions[j], velocities[j], accelerations[j],
+                            window_positions[j + 1], velocities[j + 1], accelerations[j + 1])
+
+        _, t0, h, p0, v0, a0, p1, v1, a1 = self.segment
+        return hermite((t - t0) / h, h, p0, v0, a0, p1, v1, a1, self.method)
@@ -0,0 +1,46 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from rmd_sim import SimulatedBus, sim_bus
+from motor_group import MotorGroup
+import numpy as np
+import argparse
+import time
+
+parser = argparse.ArgumentParser(description="Load test of the motor stack against simulated RMD motors.")
+parser.add_argument("--motors", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Numbers of simulated motors to test.")
+parser.add_argument("--cycles", type=int, default=200, help="Number of request/reply cycles per test.")
+parser.add_argument("--latency", type=float, default=0.0005, help="Simulated firmware reply latency in seconds.")
+parser.add_argument("--loss", type=float, default=0.0, help="Probability of losing a reply.")
+parser.add_argument("--broadcast", action="store_true", help="Request the status with one broadcast frame instead of one frame per motor.")
+args = parser.parse_args()
+
+print(f"{'motors':>6} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} {'replies/s':>10} {'missing':>8}")
+for n in args.motors:
+    ids = list(range(1, n + 1))
+    channel = f"coconuts_load_{n}"
+    with SimulatedBus(ids, channel=channel, latency=args.latency, loss=args.loss):
+        bus = sim_bus(channel)
+        try:
+            with MotorGroup(bus, ids) as group:
+                round_trips = []
+                missing = 0
+                start = time.perf_counter()
+                for _ in range(args.cycles):
+                    cycle_start = time.perf_counter()
+                    _, missing_ids = group.read_all(timeout=0.1, broadcast=args.broadcast)
+                    round_trips.append(time.perf_counter() - cycle_start)
+                    missing += len(missing_ids)
+                elapsed = time.perf_counter() - start
+        finally:
+            bus.shutdown()
+
+    round_trips = np.array(round_trips) * 1e3
+    replies = args.cycles * n - missing
+    print(f"{n:>6} {np.percentile(round_trips, 50):>9.3f} {np.percentile(round_trips, 99):>9.3f} "
+          f"{np.max(round_trips):>9.3f} {replies / elapsed:>10.0f} {missing:>8}")
@@ -6,11 +6,12 @@
 
 #     http://www.apache.org/licenses/LICENSE-2.0
 
-import can
-import can.interfaces.canalystii as canalystii
-from rmd_motor import BITRATE, RMDMotor, RMDListener
+from can_bus import connect
+from control_loop import ControlLoop
+from telemetry_log import TelemetryRecorder, default_log_dir
+from latency import LatencyMonitor, has_hardware_timestamps
+from report import start_report
 import numpy as np
-import matplotlib.pyplot as plt
 import time
 import sys
 
@@ -22,48 +23,31 @@ if len(sys.argv) <= 1:
     sys.exit(1)
 
 ids = [int(arg) for arg in sys.argv[1:]]
-
-with canalystii.CANalystIIBus(channel=0, bitrate=BITRATE, receive_own_messages=False) as bus:
-    motors = {}
-    for id in ids:
-        motors[id] = RMDMotor(bus, id)
-
-    listener = RMDListener(motors)
-    with can.Notifier(bus, [listener]):
-
-        states = {}
-        for id, motor in motors.items():
-            motor.set_position(0, max_speed_dps=200)
-            states[id] = []
-        time.sleep(2)
-        
-        t = 0
-        while t < 10:
-            step_start = time.perf_counter()
-
-            # pos = 0
-            pos = np.sin(t) * 100
-
-            for id, motor in motors.items():
-                motor.set_position(pos)
-                states[id].append((t, pos, motor.get_position(), motor.get_last_update_time()))
-            
-            t += DT
-            while time.perf_counter() - step_start < DT:
-                pass
-        
-        for id, motor in motors.items():
-            motor.stop_motor()
-
-        # Plot results
-        for id, state in states.items():
-            state = np.array(state)
-            plt.figure()
-            plt.title(f"Motor ID {id} Position Tracking")
-            plt.plot(state[:,0], state[:,1], label="Target Position", linestyle='--')
-            plt.plot(state[:,0], state[:,2], label="Actual Position")
-            plt.xlabel("Time (s)")
-            plt.ylabel("Position (degrees)")
-            plt.legend()
-            plt.grid()
-        plt.show() 
+log_dir = default_log_dir("sinus")
+
+monitor = LatencyMonitor()
+with TelemetryRecorder(log_dir) as recorder, connect(ids, recorder=recorder, monitor=monitor) as group:
+    monitor.hardware_timestamps = has_hardware_timestamps(group.bus)
+
+    for id, motor in group.motors.items():
+        motor.set_position(0, max_speed_dps=200)
+    time.sleep(2)
+    
+    loop = ControlLoop(DT)
+    for k in loop.run(int(round(10 / DT))):
+        t = k * DT
+
+        # pos = 0
+        pos = np.sin(t) * 100
+
+        group.set_positions({id: pos for id in ids})
+    loop.print_stats()
+    # Age of the statuses for the latency compensation of the report
+    recorder.set_status_age(monitor.status_age())
+    
+    for id, motor in group.motors.items():
+        motor.stop_motor()
+
+# Render the report from the telemetry log in a separate process
+print(f"Telemetry log: {log_dir}")
+start_report(log_dir, ids=ids) 
@@ -0,0 +1,95 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from rmd_codec import CMD_READ_STATUS
+import time
+
+
+class ActiveTelemetry:
+    """
+    Push telemetry stream based on the active reply mode of the motors (Command 0xB6).
+    Once started, every motor of the group sends its status reply on its own at
+    the configured interval, and the listener writes it into the state table
+    without any request frame. Use as a context manager to disable active reply
+    on exit.
+    """
+    def __init__(self, group, interval_10ms: int=1, cmd: int=CMD_READ_STATUS, ids=None):
+        self.group = group
+        self.interval_10ms = interval_10ms
+        self.cmd = cmd
+        self.ids = list(ids) if ids is not None else list(group.ids)
+
+    @property
+    def expected_rate(self):
+        """Expected number of frames per second and per motor."""
+        return 100.0 / self.interval_10ms
+
+    def start(self):
+        """Enables active reply on every motor of the stream."""
+        for id in self.ids:
+            self.group.motors[id].active_reply(self.cmd, True, self.interval_10ms)
+
+    def stop(self):
+        """Disables active reply on every motor of the stream."""
+        for id in self.ids:
+            self.group.motors[id].active_reply(self.cmd, False)
+
+    def measure_rates(self, window: float=0.5):
+        """
+        Counts the status updates received during window (s).
+        Returns a dict mapping motor IDs to their measured rate in Hz.
+        """
+        start = time.perf_counter()
+        before = self.group.state.sequences(self.ids)
+        time.sleep(window)
+        after = self.group.state.sequences(self.ids)
+        elapsed = time.perf_counter() - start
+        return {id: float(n) / elapsed for id, n in zip(self.ids, after - before)}
+
+    def verify(self, window: float=0.5, tolerance: float=0.2):
+        """
+        Checks that every motor streams at the expected rate, within tolerance
+        (relative). Returns the measured rates and the list of motor IDs below it.
+        """
+        rates = self.measure_rates(window)
+        slow = [id for id, rate in rates.items() if rate < self.expected_rate * (1 - tolerance)]
+        return rates, slow
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+if __name__ == "__main__":
+    from can_bus import connect
+    import sys
+
+    if len(sys.argv) <= 2:
+        print("Usage: python telemetry.py [INTERVAL_10MS] [IDS]")
+        print("Example: python telemetry.py 1 1 2 3")
+        sys.exit(1)
+
+    interval_10ms = int(sys.argv[1])
+    ids = [int(arg) for arg in sys.argv[2:]]
+
+    with connect(ids) as group:
+        with ActiveTelemetry(group, interval_10ms) as telemetry:
+            print(f"Expected rate: {telemetry.expected_rate:.1f} Hz per motor")
+            try:
+                while True:
+                    rates, slow = telemetry.verify(window=1.0)
+                    snapshot = group.state.snapshot(ids)
+                    for id, row in zip(ids, snapshot):
+                        flag = " (SLOW)" if id in slow else ""
+                        print(f"Motor ID {id}: {rates[id]:6.1f} Hz{flag} temp={row['temp']} "
+                              f"current={row['current']} speed={row['speed']} position={row['position']}")
+            except KeyboardInterrupt:
+                pass
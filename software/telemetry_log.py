@@ -0,0 +1,204 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from motor_state import MAX_MOTOR_ID
+import numpy as np
+import threading
+import json
+import math
+import time
+import os
+
+LOG_DIR = "logs"
+CHUNK_RECORDS = 1 << 20     # 1M records (about 60 MB) per chunk file
+CHUNK_PATTERN = "telemetry_{:06d}.npy"
+META_FILE = "meta.json"
+
+RECORD_DTYPE = np.dtype([
+    ("seq", np.uint64),         # record number, from 1 (0 marks an unwritten record)
+    ("time", np.float64),       # s, time.perf_counter()
+    ("motor_id", np.uint16),
+    ("temp", np.int16),         # °C
+    ("target", np.float64),     # deg, last commanded position (NaN if none)
+    ("position", np.float64),   # deg
+    ("speed", np.float64),      # deg/s
+    ("current", np.float64),    # A
+])
+
+
+def default_log_dir(name: str):
+    """Returns a timestamped log directory for the script name, e.g. logs/sinus_20260101_120000."""
+    return os.path.join(LOG_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+
+
+class TelemetryRecorder:
+    """
+    Appends fixed-width status records to preallocated, memory-mapped .npy
+    chunk files of a log directory. Records are written in place from the
+    listener thread, without growing any Python list, and live in the page
+    cache of the file as soon as they are written, so that they survive a
+    crash of the process. When a chunk is full, the next one is created; with
+    max_chunks, the oldest chunks are deleted so that the log acts as a ring.
+    """
+    def __init__(self, directory: str, chunk_records: int=CHUNK_RECORDS, max_chunks: int=None,
+                 max_id: int=MAX_MOTOR_ID):
+        self.directory = directory
+        self.chunk_records = chunk_records
+        self.max_chunks = max_chunks
+        self.max_id = max_id
+        self.targets = np.full(max_id + 1, np.nan)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.chunk_index = -1
+        self.chunk = None
+        self.row = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.meta = {
+            "start_time": time.time(),          # wall clock at start
+            "start_perf": time.perf_counter(),  # perf_counter at start
+            "chunk_records": chunk_records,
+        }
+        self._write_meta()
+        self._next_chunk()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _write_meta(self):
+        with open(os.path.join(self.directory, META_FILE), "w") as f:
+            json.dump(self.meta, f)
+
+    def set_status_age(self, age: float):
+        """
+        Stores the measured age (s) of the statuses when they are handled (e.g.
+        LatencyMonitor.status_age()) with the log, for the latency compensation
+        of the report. A NaN age (no round-trip measured) is not stored.
+        """
+        if not math.isnan(age):
+            self.meta["status_age"] = age
+            self._write_meta()
+
+    def _next_chunk(self):
+        if self.chunk is not None:
+            self.chunk.flush()
+        self.chunk_index += 1
+        path = os.path.join(self.directory, CHUNK_PATTERN.format(self.chunk_index))
+        self.chunk = np.lib.format.open_memmap(path, mode="w+", dtype=RECORD_DTYPE, shape=(self.chunk_records,))
+        self.row = 0
+        if self.max_chunks is not None and self.chunk_index >= self.max_chunks:
+            os.remove(os.path.join(self.directory, CHUNK_PATTERN.format(self.chunk_index - self.max_chunks)))
+
+    def set_targets(self, positions: dict):
+        """Sets the commanded positions (deg) stored with the next records, from a motor ID -> angle dict."""
+        targets = self.targets
+        for id, angle_deg in positions.items():
+            if id <= self.max_id:
+                targets[id] = angle_deg
+
+    def record(self, motor_id: int, status):
+        """Appends a record of a motor status (MotorStatus)."""
+        with self.lock:
+            if self.row >= self.chunk_records:
+                self._next_chunk()
+            self.seq += 1
+            self.chunk[self.row] = (self.seq, status.last_update, motor_id, status.temp, self.targets[motor_id],
+                                    status.position, status.speed, status.current)
+            self.row += 1
+
+    def flush(self):
+        """Writes the current chunk to disk."""
+        with self.lock:
+            self.chunk.flush()
+
+    def close(self):
+        """Flushes and releases the current chunk."""
+        with self.lock:
+            if self.chunk is not None:
+                self.chunk.flush()
+                self.chunk = None
+
+
+class TelemetryLog:
+    """
+    Reader of a log directory written by TelemetryRecorder.
+    Chunks are opened with np.memmap (read-only), so that multi-hour logs can be
+    analyzed without loading them; only the written records of each chunk are
+    exposed.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        names = sorted(name for name in os.listdir(directory) if name.startswith("telemetry_") and name.endswith(".npy"))
+        self.chunks = []
+        for name in names:
+            chunk = np.load(os.path.join(directory, name), mmap_mode="r")
+            written = np.count_nonzero(chunk["seq"])
+            if written:
+                self.chunks.append(chunk[:written])
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def __iter__(self):
+        """Iterates over the chunks as zero-copy record arrays."""
+        return iter(self.chunks)
+
+    def records(self):
+        """Returns all the records as a single array (a copy when there are several chunks)."""
+        if len(self.chunks) == 1:
+            return self.chunks[0]
+        if not self.chunks:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.concatenate(self.chunks)
+
+    def motor_ids(self):
+        """Returns the sorted motor IDs present in the log."""
+        return sorted(set().union(*(np.unique(chunk["motor_id"]).tolist() for chunk in self.chunks)))
+
+    def motor(self, motor_id: int):
+        """Returns the records of one motor, in time order."""
+        parts = [chunk[chunk["motor_id"] == motor_id] for chunk in self.chunks]
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.concatenate(parts)
+
+    def elapsed(self, records):
+        """Returns the times of records relative to the start of the log (s)."""
+        return records["time"] - self.meta["start_perf"]
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plots a telemetry log recorded by TelemetryRecorder.")
+    parser.add_argument("directory", help="Log directory.")
+    parser.add_argument("--ids", type=int, nargs="+", help="Motor IDs to plot (all by default).")
+    args = parser.parse_args()
+
+    log = TelemetryLog(args.directory)
+    ids = args.ids if args.ids is not None else log.motor_ids()
+    print(f"{len(log)} records in {len(log.chunks)} chunks, motors {ids}")
+
+    for id in ids:
+        records = log.motor(id)
+        t = log.elapsed(records)
+        plt.figure()
+        plt.title(f"Motor ID {id} Position Tracking")
+        plt.plot(t, records["target"], label="Target Position", linestyle='--')
+        plt.plot(t, records["position"], label="Actual Position")
+        plt.xlabel("Time (s)")
+        plt.ylabel("Position (degrees)")
+        plt.legend()
+        plt.grid()
+    plt.show()
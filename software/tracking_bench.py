@@ -0,0 +1,239 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from leg import MOTOR_SIGNS, MOTOR_IDS
+from telemetry_log import TelemetryRecorder, TelemetryLog, default_log_dir
+from control_loop import ControlLoop
+from contextlib import ExitStack
+import numpy as np
+import subprocess
+import itertools
+import platform
+import json
+import math
+import time
+
+MOTORS = ("knee_motor", "ankle_motor")
+LAG_RESOLUTION = 0.001  # s, resampling step of the phase lag estimation
+
+
+def software_version():
+    """Returns the git description of the working tree, or None outside of git."""
+    try:
+        result = subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def estimate_lag(times, reference_times, reference, position, max_lag: float):
+    """
+    Estimates the delay (s) of position (sampled at times) behind the reference
+    signal, as the shift between 0 and max_lag that minimizes their mean squared
+    difference. Returns NaN if the reference does not move.
+    """
+    grid = np.arange(times[0], times[-1], LAG_RESOLUTION)
+    if len(grid) < 2:
+        return math.nan
+    ref = np.interp(grid, reference_times, reference)
+    pos = np.interp(grid, times, position)
+    if np.std(ref) < 1e-6:
+        return math.nan
+
+    n_lags = min(int(max_lag / LAG_RESOLUTION), len(grid) // 2)
+    mse = [np.mean((ref[:len(ref) - lag] - pos[lag:]) ** 2) for lag in range(n_lags + 1)]
+    return int(np.argmin(mse)) * LAG_RESOLUTION
+
+
+def tracking_metrics(records, reference_times, reference, omega: float):
+    """
+    Computes the tracking metrics of one motor from its telemetry records and
+    its commanded reference (deg) at reference_times (perf_counter, s).
+    """
+    if len(records) < 2:
+        return {"samples": int(len(records)), "rms_error": None, "max_error": None, "lag": None, "phase_lag": None}
+    times = records["time"]
+    error = records["position"] - np.interp(times, reference_times, reference)
+    lag = estimate_lag(times, reference_times, reference, records["position"], max_lag=math.pi / omega)
+    return {
+        "samples": int(len(records)),
+        "rms_error": float(np.sqrt(np.mean(error ** 2))),        # deg
+        "max_error": float(np.max(np.abs(error))),              # deg
+        "lag": None if math.isnan(lag) else lag,                # s
+        "phase_lag": None if math.isnan(lag) else math.degrees(lag * omega),   # deg
+    }
+
+
+def run_case(group, mapping, mode: str, dt: float, omega: float, amplitude: float, periods: float, settle: float):
+    """
+    Plays one benchmark trajectory on the leg and returns the run description,
+    with the time window of the run and the commanded reference of each motor.
+    """
+    duration = periods * 2 * math.pi / omega
+    motor_traj = mapping.motor_trajectory(duration, dt, mode, omega, amplitude)
+    ids = [MOTOR_IDS[name] for name in MOTORS]
+    commands = motor_traj[:, 1:] * np.array([MOTOR_SIGNS[name] for name in MOTORS])
+
+    group.set_positions(dict(zip(ids, commands[0])), max_speed_dps=500)
+    time.sleep(settle)
+
+    loop = ControlLoop(dt)
+    send_times = np.zeros(len(commands))
+    start = time.perf_counter()
+    for k in loop.run(len(commands)):
+        send_times[k] = time.perf_counter()
+        group.set_positions(dict(zip(ids, commands[k])))
+    end = time.perf_counter()
+
+    stats = loop.stats()
+    run = {
+        "mode": mode,
+        "dt": dt,
+        "omega": omega,
+        "amplitude": amplitude,
+        "duration": duration,
+        "loop": {
+            "target_rate": 1 / dt,
+            "rate": (len(send_times) - 1) / (send_times[-1] - send_times[0]) if len(send_times) > 1 else None,
+            "overruns": stats["overruns"],
+            "jitter_p99": stats.get("jitter_p99"),
+            "jitter_max": stats.get("jitter_max"),
+        },
+    }
+    return run, (start, end + dt), send_times, dict(zip(ids, commands.T))
+
+
+def run_sweep(modes, dts, omegas, amplitudes, periods: float=2, settle: float=1.0, interface: str=None, log_dir: str=None,
+              worker: bool=False):
+    """
+    Runs every combination of modes, time steps, frequencies and amplitudes on
+    the leg (real or simulated, depending on interface) and returns the results.
+    With worker, the bus is handled by an IOWorker process instead of threads
+    of this process.
+    """
+    from leg_mapping import load_mapping
+    from can_bus import connect
+
+    mapping = load_mapping()
+    log_dir = log_dir if log_dir is not None else default_log_dir("tracking")
+    ids = [MOTOR_IDS[name] for name in MOTORS]
+
+    # Every trajectory is mapped once before moving the motors, so that an
+    # amplitude out of the range of the leg mapping fails before the first run
+    grid = list(itertools.product(modes, dts, omegas, amplitudes))
+    for mode, dt, omega, amplitude in grid:
+        mapping.motor_trajectory(periods * 2 * math.pi / omega, dt, mode, omega, amplitude)
+
+    cases = []
+    with ExitStack() as stack:
+        if worker:
+            from io_worker import IOWorker
+            group = stack.enter_context(IOWorker(ids, interface, log_dir=log_dir))
+        else:
+            recorder = stack.enter_context(TelemetryRecorder(log_dir))
+            group = stack.enter_context(connect(ids, interface=interface, recorder=recorder))
+        for mode, dt, omega, amplitude in grid:
+            print(f"Running {mode}, dt={dt} s, omega={omega} rad/s, amplitude={amplitude}...")
+            cases.append(run_case(group, mapping, mode, dt, omega, amplitude, periods, settle))
+        group.stop_motors()
+
+    log = TelemetryLog(log_dir)
+    runs = []
+    for run, (start, end), send_times, references in cases:
+        run["motors"] = {}
+        for name, id in zip(MOTORS, ids):
+            records = log.motor(id)
+            records = records[(records["time"] >= start) & (records["time"] <= end)]
+            run["motors"][name] = tracking_metrics(records, send_times, references[id], run["omega"])
+        runs.append(run)
+
+    return {
+        "version": software_version(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "host": platform.node(),
+        "interface": interface,
+        "worker": worker,
+        "log_dir": log_dir,
+        "runs": runs,
+    }
+
+
+def run_key(run):
+    return (run["mode"], run["dt"], run["omega"], run["amplitude"])
+
+
+def print_results(results):
+    """Prints the metrics of every run."""
+    print(f"{'mode':>10} {'dt':>6} {'omega':>6} {'ampl':>5} {'rate (Hz)':>9} {'overruns':>8} "
+          f"{'motor':>11} {'rms (deg)':>9} {'max (deg)':>9} {'lag (ms)':>8} {'phase (deg)':>11}")
+    for run in results["runs"]:
+        for name, metrics in run["motors"].items():
+            lag_ms = metrics["lag"] * 1e3 if metrics["lag"] is not None else None
+            print(f"{run['mode']:>10} {run['dt']:>6} {run['omega']:>6} {run['amplitude']:>5} "
+                  f"{_format(run['loop']['rate'], '.1f'):>9} {run['loop']['overruns']:>8} {name:>11} "
+                  f"{_format(metrics['rms_error'], '.3f'):>9} {_format(metrics['max_error'], '.3f'):>9} "
+                  f"{_format(lag_ms, '.1f'):>8} {_format(metrics['phase_lag'], '.1f'):>11}")
+
+
+def compare(base, new):
+    """Prints the metric changes from the base results to the new ones, for the runs found in both."""
+    base_runs = {run_key(run): run for run in base["runs"]}
+    print(f"Comparing {base.get('version')} ({base.get('date')}) -> {new.get('version')} ({new.get('date')})")
+    print(f"{'mode':>10} {'dt':>6} {'omega':>6} {'ampl':>5} {'motor':>11} {'metric':>10} {'base':>9} {'new':>9} {'change':>9}")
+    for run in new["runs"]:
+        reference = base_runs.get(run_key(run))
+        if reference is None:
+            continue
+        rows = [("loop", "rate", reference["loop"]["rate"], run["loop"]["rate"])]
+        for name, metrics in run["motors"].items():
+            for metric in ("rms_error", "max_error", "phase_lag"):
+                rows.append((name, metric, reference["motors"].get(name, {}).get(metric), metrics[metric]))
+        for name, metric, before, after in rows:
+            change = after - before if before is not None and after is not None else None
+            print(f"{run['mode']:>10} {run['dt']:>6} {run['omega']:>6} {run['amplitude']:>5} {name:>11} {metric:>10} "
+                  f"{_format(before, '.3f'):>9} {_format(after, '.3f'):>9} {_format(change, '+.3f'):>9}")
+
+
+def _format(value, spec: str):
+    return "-" if value is None else format(value, spec)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tracking performance benchmark of the one leg rig (real or simulated motors).")
+    parser.add_argument("--modes", nargs="+", default=["knee_only", "ankle_only", "both"], help="Trajectory modes.")
+    parser.add_argument("--dt", type=float, nargs="+", default=[0.02, 0.01, 0.005], help="Control time steps in seconds.")
+    parser.add_argument("--omega", type=float, nargs="+", default=[2.0], help="Trajectory angular frequencies in rad/s.")
+    parser.add_argument("--amplitude", type=float, nargs="+", default=[1.0], help="Trajectory amplitude scales.")
+    parser.add_argument("--periods", type=float, default=2, help="Number of trajectory periods per run.")
+    parser.add_argument("--settle", type=float, default=1.0, help="Time to reach the start position before each run in seconds.")
+    parser.add_argument("--interface", help="CAN interface (sim for simulated motors), COCONUTS_CAN_INTERFACE by default.")
+    parser.add_argument("--worker", action="store_true", help="Handle the bus in a separate I/O worker process.")
+    parser.add_argument("--output", help="Output JSON file (logs/tracking_<date>.json by default).")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files instead of running.")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        compare(base, new)
+    else:
+        log_dir = default_log_dir("tracking")
+        try:
+            results = run_sweep(args.modes, args.dt, args.omega, args.amplitude, args.periods, args.settle,
+                                args.interface, log_dir, args.worker)
+        except ValueError as e:
+            raise SystemExit(f"Error: {e}")
+        output = args.output if args.output is not None else log_dir + ".json"
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print_results(results)
+        print(f"Results written to {output}")
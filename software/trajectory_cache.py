@@ -0,0 +1,51 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+from leg import ROBOT_PATH, solve_trajectory
+import numpy as np
+import hashlib
+import os
+
+CACHE_DIR = ".cache/trajectories"
+CACHE_VERSION = 1  # Increase when the way trajectories are solved changes
+
+
+def urdf_hash(robot_path: str=ROBOT_PATH):
+    """Returns the SHA-256 digest of the robot URDF."""
+    with open(os.path.join(robot_path, "robot.urdf"), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_path(mode: str, duration: float, dt: float, robot_path: str=ROBOT_PATH, cache_dir: str=CACHE_DIR):
+    """
+    Returns the cache file of a trajectory. The key covers the trajectory type,
+    its duration and time step, and the robot URDF.
+    """
+    key = f"{CACHE_VERSION}:{mode}:{duration!r}:{dt!r}:{urdf_hash(robot_path)}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{mode}_{digest}.npz")
+
+
+def load_trajectory(mode: str, duration: float, dt: float, robot_path: str=ROBOT_PATH, cache_dir: str=CACHE_DIR):
+    """
+    Returns the motor trajectory (rows of t, knee_motor, ankle_motor in degrees)
+    and robot configurations of a benchmark trajectory. The trajectory is solved
+    once and then loaded from a compressed .npz file on later calls.
+    """
+    path = cache_path(mode, duration, dt, robot_path, cache_dir)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return data["motor_traj"], data["q"]
+
+    print(f"Solving {mode} trajectory ({duration:.2f} s, dt={dt} s)...")
+    motor_traj, qs = solve_trajectory(duration, dt, mode, robot_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, motor_traj=motor_traj, q=qs)
+    os.replace(tmp_path, path)
+    return motor_traj, qs
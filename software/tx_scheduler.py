@@ -0,0 +1,251 @@
+# Copyright 2026 Marc Duclusaud
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import can
+from rmd_codec import FRAME_BITS, COMMAND_BASE, BROADCAST_ID, CMD_STOP, CMD_BRAKE, CMD_POSITION, reply_key
+from rmd_motor import BITRATE
+from collections import deque
+import threading
+import time
+
+# Priorities, highest first
+PRIORITY_STOP = 0       # Stop and brake, never throttled
+PRIORITY_SETPOINT = 1   # Position setpoints
+PRIORITY_REQUEST = 2    # Status requests and configuration
+PRIORITIES = {CMD_STOP: PRIORITY_STOP, CMD_BRAKE: PRIORITY_STOP, CMD_POSITION: PRIORITY_SETPOINT}
+
+BUDGET = 0.8            # Default fraction of the bus available to the requests and their replies
+BURST_FRAMES = 16       # Frames that can be sent back-to-back before the budget applies
+MAX_RETRIES = 3         # Attempts after a failed send before the frame is dropped
+RETRY_DELAY = 0.0005    # s, backoff after a failed send (a few frames on the bus)
+CLOSE_TIMEOUT = 1.0     # s, time given to the pending frames to be sent on close
+
+
+class TransmitScheduler:
+    """
+    Transmit queue of a CAN bus, sending the frames submitted by the motors
+    from its own thread.
+    There is at most one pending frame per (arbitration ID, channel, command
+    kind): a frame submitted while the previous one of the same kind is still
+    pending replaces its data in place (coalesced), so that a new setpoint is
+    never queued behind a stale one. Pending frames are sent by priority
+    (stop/brake, then setpoints, then requests) and in submission order within
+    a priority. A stop or brake frame also discards the pending setpoints of
+    its motor (of the whole channel for a broadcast).
+
+    The bus load is limited with a token bucket to budget (fraction of the
+    bitrate), counting each request with its reply (frames_per_request frames
+    of FRAME_BITS bits), as in multi_bus.bus_utilization. Stop and brake frames
+    are never throttled. A frame whose send fails (e.g. full adapter buffer) is
+    retried after RETRY_DELAY, up to max_retries times, then dropped.
+
+    With a LatencyMonitor attached, frames are tagged when they are handed to
+    the bus rather than when they are submitted, so that the time spent in the
+    queue is not counted in the round-trips. The tag of a failed send is
+    withdrawn, and the retry is tagged again.
+    """
+    def __init__(self, bus, budget: float=BUDGET, bitrate: int=BITRATE, frames_per_request: int=2,
+                 burst_frames: int=BURST_FRAMES, max_retries: int=MAX_RETRIES):
+        self.bus = bus
+        self.budget = budget
+        self.bitrate = bitrate
+        self.rate = budget * bitrate                        # bits/s
+        self.frame_cost = frames_per_request * FRAME_BITS   # bits
+        self.capacity = burst_frames * self.frame_cost      # bits
+        self.max_retries = max_retries
+        self.lock = threading.Condition(threading.Lock())
+        self.slots = {}                                     # key -> [message, attempts]
+        self.queues = [deque() for _ in range(PRIORITY_REQUEST + 1)]
+        self.thread = None
+        self.running = False
+        self.monitor = None
+        self.broadcast_ids = ()
+        self.reset_stats()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def reset_stats(self):
+        """Clears the counters and restarts the utilization measurement."""
+        self.submitted = 0
+        self.sent = 0
+        self.coalesced = 0      # Frames replaced by a newer one of the same kind before being sent
+        self.superseded = 0     # Setpoints discarded by a stop or brake frame
+        self.retries = 0
+        self.dropped = 0        # Frames given up after max_retries failed sends
+        self.throttled = 0      # Waits for the budget
+        self.max_pending = 0
+        self.start_time = time.perf_counter()
+        self.tokens = self.capacity
+        self.refill_time = self.start_time
+
+    def attach_monitor(self, monitor, broadcast_ids=()):
+        """
+        Tags every transmitted frame in a LatencyMonitor, as a request to its
+        motor, or to the motors of broadcast_ids for a broadcast frame.
+        """
+        self.monitor = monitor
+        self.broadcast_ids = tuple(broadcast_ids)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="CAN transmit scheduler", daemon=True)
+        self.thread.start()
+
+    def close(self, timeout: float=CLOSE_TIMEOUT):
+        """Waits for the pending frames to be sent (at most timeout s) and stops the thread."""
+        deadline = time.perf_counter() + timeout
+        with self.lock:
+            while self.slots and time.perf_counter() < deadline:
+                self.lock.wait(deadline - time.perf_counter())
+            self.running = False
+            self.lock.notify_all()
+        self.thread.join()
+        self.thread = None
+
+    def submit(self, msg):
+        """
+        Queues a copy of msg, replacing the pending frame of the same kind if
+        any. Returns immediately.
+        """
+        with self.lock:
+            self._submit(msg)
+            self.lock.notify_all()
+
+    def send_burst(self, messages):
+        """Queues a list of messages at once (e.g. the setpoints of one control tick)."""
+        with self.lock:
+            for msg in messages:
+                self._submit(msg)
+            self.lock.notify_all()
+
+    def _submit(self, msg):
+        self.submitted += 1
+        data = msg.data
+        kind = reply_key(data)
+        key = (msg.arbitration_id, msg.channel, kind)
+        slot = self.slots.get(key)
+        if slot is not None:
+            slot[0].data[:] = data
+            slot[1] = 0
+            self.coalesced += 1
+            return
+
+        priority = PRIORITIES.get(data[0], PRIORITY_REQUEST)
+        if priority == PRIORITY_STOP:
+            self._discard_setpoints(msg.arbitration_id, msg.channel)
+        self.slots[key] = [can.Message(arbitration_id=msg.arbitration_id, data=bytearray(data),
+                                       is_extended_id=msg.is_extended_id, channel=msg.channel), 0]
+        self.queues[priority].append(key)
+        self.max_pending = max(self.max_pending, len(self.slots))
+
+    def _discard_setpoints(self, arbitration_id: int, channel):
+        queue = self.queues[PRIORITY_SETPOINT]
+        for key in list(queue):
+            if key[1] == channel and (arbitration_id == BROADCAST_ID or key[0] == arbitration_id):
+                queue.remove(key)
+                del self.slots[key]
+                self.superseded += 1
+
+    def _stopping(self, arbitration_id: int, channel):
+        """Returns whether a stop or brake frame is pending for the motor of arbitration_id."""
+        return any(key[1] == channel and (key[0] == BROADCAST_ID or key[0] == arbitration_id)
+                   for key in self.queues[PRIORITY_STOP])
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.refill_time) * self.rate)
+        self.refill_time = now
+
+    def _next(self):
+        """
+        Returns the priority, key and slot of the next frame to send, waiting
+        for a frame or for the budget. Returns None once closed. Called with the lock held.
+        """
+        while self.running:
+            priority = next((p for p, queue in enumerate(self.queues) if queue), None)
+            if priority is None:
+                self.lock.wait()
+                continue
+            now = time.perf_counter()
+            self._refill(now)
+            if priority != PRIORITY_STOP and self.tokens < self.frame_cost:
+                # Woken up early if a stop frame is submitted meanwhile
+                self.throttled += 1
+                self.lock.wait((self.frame_cost - self.tokens) / self.rate)
+                continue
+            key = self.queues[priority].popleft()
+            slot = self.slots.pop(key)
+            self.tokens -= self.frame_cost
+            return priority, key, slot
+        return None
+
+    def _run(self):
+        while True:
+            with self.lock:
+                item = self._next()
+                if item is None:
+                    return
+                priority, key, (msg, attempts) = item
+
+            monitor = self.monitor
+            if monitor is not None:
+                ids = self.broadcast_ids if msg.arbitration_id == BROADCAST_ID else (msg.arbitration_id - COMMAND_BASE,)
+                monitor.on_send(ids, msg.data[0])
+            try:
+                self.bus.send(msg)
+            except can.CanError:
+                if monitor is not None:
+                    monitor.on_failed(ids, msg.data[0])
+                with self.lock:
+                    if key in self.slots:
+                        self.coalesced += 1             # A newer frame of the same kind is pending
+                    elif priority == PRIORITY_SETPOINT and self._stopping(msg.arbitration_id, msg.channel):
+                        self.superseded += 1            # Never sent after a stop submitted meanwhile
+                    elif attempts < self.max_retries:
+                        self.retries += 1
+                        self.slots[key] = [msg, attempts + 1]
+                        self.queues[priority].appendleft(key)
+                        self.lock.wait(RETRY_DELAY)
+                    else:
+                        self.dropped += 1
+                    self.lock.notify_all()
+                continue
+
+            with self.lock:
+                self.sent += 1
+                if not self.slots:
+                    self.lock.notify_all()  # Wakes up close()
+
+    def stats(self):
+        """Returns the counters, the number of pending frames and the measured bus utilization."""
+        with self.lock:
+            elapsed = time.perf_counter() - self.start_time
+            return {
+                "submitted": self.submitted,
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+                "superseded": self.superseded,
+                "retries": self.retries,
+                "dropped": self.dropped,
+                "throttled": self.throttled,
+                "pending": len(self.slots),
+                "max_pending": self.max_pending,
+                "utilization": self.sent * self.frame_cost / (elapsed * self.bitrate) if elapsed > 0 else 0.0,
+            }
+
+    def print_stats(self):
+        """Prints the transmit statistics."""
+        stats = self.stats()
+        print(f"Transmit: {stats['sent']}/{stats['submitted']} frames sent, {stats['coalesced']} coalesced, "
+              f"{stats['superseded']} superseded, {stats['retries']} retries, {stats['dropped']} dropped, "
+              f"{stats['throttled']} throttled, bus load {stats['utilization'] * 100:.1f} % "
+              f"(budget {self.budget * 100:.0f} %)")